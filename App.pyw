@@ -1,7 +1,6 @@
 #App.py
 import tkinter as tk
 from tkinter import ttk
-import queue
 import subprocess
 import sys
 import os
@@ -10,7 +9,7 @@ import ipaddress
 
 from ClientThreads import Client
 from Client_GUI import ClientGui
-from ServerThreads import Server
+from ServerThreads import Server, CommandQueue, LatestFrameSlots
 from Server_GUI import ServerGui
 
 # Define default IP addresses and port
@@ -308,8 +307,8 @@ def run_server_mode(ip, port):
         relaunch(reason)
 
     root = tk.Tk()
-    command_queue = queue.Queue()
-    frame_queue = queue.Queue()
+    command_queue = CommandQueue()
+    frame_queue = LatestFrameSlots()
 
     app = ServerGui(port, root, command_queue, frame_queue)
     server = Server(ip, port, app, command_queue, frame_queue, close_callback=on_server_close)
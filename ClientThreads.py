@@ -1,15 +1,50 @@
 #ClientThreads.py
 import socket
+import functools
+import hashlib
 import Encryption
+import queue
 import threading
 import time
-import zlib
 
-from FunctionsModule import InputController, UserBlocker, take_screenshot, recv_all
+try:
+    from xxhash import xxh3_64_intdigest as frame_digest  # SIMD hash for detecting unchanged frames
+except ImportError:
+    def frame_digest(data):
+        return hashlib.blake2b(data, digest_size=8).digest()
+
+from FunctionsModule import (InputController, UserBlocker, take_screenshot, recv_all, send_all_parts,
+                             unsent_bytes, USE_COMPRESSION, FRAME_LENGTH, COMMAND_LENGTH)
+
+if USE_COMPRESSION:
+    try:
+        import zstandard  # Frame codec, only required when USE_COMPRESSION is enabled
+    except ImportError as e:
+        raise ImportError("USE_COMPRESSION is enabled but the zstandard package is not installed") from e
 
 # Frames per second for screen sharing
 FPS = 10
 
+# Maximum number of identical frames skipped in a row before one is resent as a refresh
+MAX_SKIPPED_FRAMES = 2 * FPS
+
+# Kernel receive buffer size for the session socket, large enough to hold full-resolution frames.
+# The send buffer is left to the OS: pinning it this large would hide seconds of queued frames.
+SOCKET_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Capacity of each queue between screen share pipeline stages; full queues drop their oldest frame
+PIPELINE_QUEUE_SIZE = 2
+
+# Smoothing factor for the moving average of frame send time used to pace capture
+SEND_TIME_SMOOTHING = 0.2
+
+# Frames' worth of unsent bytes the socket may hold before capture skips a frame
+MAX_UNSENT_FRAMES = 2
+
+# A frame slower than this many frame periods counts as slow; after enough in a row the next frame is skipped
+SLOW_FRAME_FACTOR = 1.5
+SLOW_FRAMES_BEFORE_SKIP = 3
+
 
 class Client(threading.Thread):
     """
@@ -36,10 +71,10 @@ class Client(threading.Thread):
         self._disconnected = False
         self._lock = threading.Lock()
 
-        # RSA encryption setup
-        self.private_key, self.public_key = Encryption.generate_rsa_keys()
-        self.server_rsa_key = None
+        # ECDH (X25519) encryption setup; an ephemeral key pair is generated per connection in key_exchange
+        self.server_public_key = None
         self.server_aes_key = None
+        self.server_aes_cipher = None  # Reusable AES-GCM context built once after key exchange
 
         # Threading and control mechanisms
         self.pause_event = threading.Event()
@@ -51,6 +86,19 @@ class Client(threading.Thread):
         self.input_controller = InputController(self.block_event, self.block_event_lock, self.blocker)
         self.stop_event = threading.Event()
 
+        # Command name -> handler taking the text after the first colon; a returned string stops the client
+        self._command_handlers = {
+            "key_down": functools.partial(self.input_controller.handle_input, "key_down"),
+            "key_up": functools.partial(self.input_controller.handle_input, "key_up"),
+            "button": functools.partial(self.input_controller.handle_input, "button"),
+            "resize": self._handle_resize,
+            "kick": self._handle_kick,
+            "block": self._handle_block,
+            "unblock": self._handle_unblock,
+            "pause": self._handle_pause,
+            "unpause": self._handle_unpause,
+        }
+
     def run(self):
         """
         Run the client thread to connect to the server, handle commands,
@@ -58,7 +106,11 @@ class Client(threading.Thread):
         """
         stop_reason = "client crashed"
         try:
+            # Enlarge the receive buffer before connecting so the TCP window can scale to full frames
+            self.client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
             self.client.connect((self.address, self.port))
+            # Disable Nagle so frame and header writes are not held back waiting for ACKs
+            self.client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             print(f"[Client] Connected to server at {self.address}:{self.port}")
             self.key_exchange()
 
@@ -67,55 +119,26 @@ class Client(threading.Thread):
 
             while not self.stop_event.is_set():
                 try:
-                    # Receive command length and actual command (AES encrypted)
-                    cmd_len_bytes = recv_all(self.client, 4)
-                    cmd_len = int.from_bytes(cmd_len_bytes, 'big')
+                    if hasattr(socket, "TCP_QUICKACK"):
+                        # Linux clears quick-ack after each ACK, so re-arm it before every receive
+                        self.client.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
+                    # Receive command length and nonce together, then the actual command (AES encrypted)
+                    header = recv_all(self.client, COMMAND_LENGTH.size + Encryption.NONCE_SIZE)
+                    cmd_len, = COMMAND_LENGTH.unpack_from(header)
+                    nonce = header[COMMAND_LENGTH.size:]
 
-                    iv = recv_all(self.client, 16)
                     encrypted_cmd = recv_all(self.client, cmd_len)
-                    command = Encryption.decrypt_aes(self.server_aes_key, iv, encrypted_cmd).decode()
-
-                    # Handle input-related commands
-                    if command.startswith(("key_down", "key_up", "button")):
-                        self.input_controller.handle_command(command)
-
-                    # Handle resize command
-                    elif command.startswith("resize"):
-                        try:
-                            _, width, height = command.split(":")
-                            width, height = int(width), int(height)
-                            print(f"[Client] Resizing to: {width}x{height}")
-                            self.img_size = (width, height)
-                            if self.screen_share:
-                                self.screen_share.update_size(self.img_size)
-                        except ValueError as e:
-                            print(f"[Client] Invalid resize command: {command} ({e})")
-
-                    # Handle session termination command
-                    elif command == "kick":
-                        stop_reason = "kicked from session"
-                        print("[Client] Received kick command.")
-                        break
-
-                    # Block/unblock user input
-                    if command == "block":
-                        with self.block_event_lock:
-                            self.block_event.set()
-                        self.blocker.start_blocking()
-                        print("Blocking: True")
-                    elif command == "unblock":
-                        with self.block_event_lock:
-                            self.block_event.clear()
-                        self.blocker.stop_blocking()
-                        print("Blocking: False")
-
-                    # Pause/unpause screen sharing
-                    elif command == "pause":
-                        self.pause_event.set()
-                        print("Paused: True")
-                    elif command == "unpause":
-                        self.pause_event.clear()
-                        print("Paused: False")
+                    command = Encryption.decrypt_aes(self.server_aes_cipher, nonce, encrypted_cmd).decode()
+
+                    # Parse the command name once and dispatch to its handler
+                    name, _, args = command.partition(":")
+                    handler = self._command_handlers.get(name)
+                    if handler is not None:
+                        handler_stop_reason = handler(args)
+                        if handler_stop_reason:
+                            stop_reason = handler_stop_reason
+                            break
 
                 except (ConnectionResetError, ConnectionError) as e:
                     print(f"[Client] Error: {e}")
@@ -128,24 +151,83 @@ class Client(threading.Thread):
         finally:
             self.stop(stop_reason)
 
+    def _handle_resize(self, args):
+        """
+        Handle a "resize:<width>:<height>" command by changing the screen share resolution.
+
+        :param args: String "<width>:<height>".
+        :type args: str
+        """
+        try:
+            width, height = args.split(":")
+            width, height = int(width), int(height)
+            print(f"[Client] Resizing to: {width}x{height}")
+            self.img_size = (width, height)
+            if self.screen_share:
+                self.screen_share.update_size(self.img_size)
+        except ValueError as e:
+            print(f"[Client] Invalid resize command: resize:{args} ({e})")
+
+    def _handle_kick(self, args):
+        """
+        Handle the session termination command.
+
+        :return: Stop reason for the client.
+        :rtype: str
+        """
+        print("[Client] Received kick command.")
+        return "kicked from session"
+
+    def _handle_block(self, args):
+        """
+        Block local user input.
+        """
+        with self.block_event_lock:
+            self.block_event.set()
+        self.blocker.start_blocking()
+        print("Blocking: True")
+
+    def _handle_unblock(self, args):
+        """
+        Unblock local user input.
+        """
+        with self.block_event_lock:
+            self.block_event.clear()
+        self.blocker.stop_blocking()
+        print("Blocking: False")
+
+    def _handle_pause(self, args):
+        """
+        Pause screen sharing.
+        """
+        self.pause_event.set()
+        print("Paused: True")
+
+    def _handle_unpause(self, args):
+        """
+        Resume screen sharing.
+        """
+        self.pause_event.clear()
+        print("Paused: False")
+
     def key_exchange(self):
         """
-        Perform RSA public key exchange with the server and receive AES session key.
+        Perform X25519 public key exchange with the server and derive the AES session key.
         """
-        # Send our public key to the server
-        pub_key_bytes = Encryption.serialize_public_key(self.public_key)
-        self.client.send(len(pub_key_bytes).to_bytes(4, 'big'))
-        self.client.send(pub_key_bytes)
+        # Generate a fresh key pair here rather than in __init__, which runs on the GUI thread.
+        # It is kept only for this call, so the session key cannot be re-derived later
+        private_key, public_key = Encryption.generate_ecdh_keys()
+
+        # Send our raw public key to the server (fixed size, no length prefix needed)
+        self.client.sendall(Encryption.serialize_public_key(public_key))
 
         # Receive server's public key
-        server_key_len = int.from_bytes(recv_all(self.client, 4), 'big')
-        server_key_bytes = recv_all(self.client, server_key_len)
-        self.server_rsa_key = Encryption.deserialize_public_key(server_key_bytes)
+        server_key_bytes = recv_all(self.client, Encryption.PUBLIC_KEY_SIZE)
+        self.server_public_key = Encryption.deserialize_public_key(server_key_bytes)
 
-        # Receive AES session key encrypted with our public RSA key
-        aes_key_len = int.from_bytes(recv_all(self.client, 4), 'big')
-        encrypted_aes_key = recv_all(self.client, aes_key_len)
-        self.server_aes_key = Encryption.rsa_decrypt(self.private_key, encrypted_aes_key)
+        # Both sides derive the same AES session key from the ECDH shared secret
+        self.server_aes_key = Encryption.derive_aes_key(private_key, self.server_public_key)
+        self.server_aes_cipher = Encryption.create_aes_cipher(self.server_aes_key)
 
     def stop(self, stop_reason):
         """
@@ -173,6 +255,9 @@ class ScreenShare(threading.Thread):
     """
     The ScreenShare class handles periodic screen capturing, compression,
     encryption, and transmission to the server.
+
+    Capture runs on this thread, while encryption and sending run on two helper threads
+    connected by small bounded queues, so the stages overlap instead of running back to back.
     """
 
     def __init__(self, client, aes_key, pause_event):
@@ -189,24 +274,48 @@ class ScreenShare(threading.Thread):
         super().__init__()
         self.client = client
         self.aes_key = aes_key
+        self.aes_cipher = Encryption.create_aes_cipher(aes_key)  # Reused for every frame
         self.img_size = (1920, 1080)
         self.stop_event = threading.Event()
         self.pause_event = pause_event
         self._lock = threading.Lock()
+        self._last_digest = None  # Hash of the last frame actually sent
+        self._skipped_frames = 0  # Identical frames skipped since the last send
+        self._send_time_avg = 0.0  # Moving average of seconds spent writing one frame to the socket
+        self._frame_size = 0  # Wire size of the last frame sent, used to judge the socket's backlog
+        self._slow_frames = 0  # Frames in a row that took well over the frame period
+        # Compression context reused by the encrypt stage for every frame
+        self._compressor = zstandard.ZstdCompressor(level=3) if USE_COMPRESSION else None
+
+        # Pipeline stages: capture (this thread) -> encrypt -> send
+        self._encrypt_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self._send_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self._encryptor = threading.Thread(target=self._encrypt_loop, daemon=True)
+        self._sender = threading.Thread(target=self._send_loop, daemon=True)
 
     def run(self):
         """
-        Continuously capture, compress, encrypt, and send screen frames to the server.
+        Continuously capture screen frames and hand them to the encrypt stage.
         """
+        self._encryptor.start()
+        self._sender.start()
+
         while not self.stop_event.is_set():
             if self.pause_event.is_set():
+                self._last_digest = None  # Always send a fresh frame after unpausing
                 time.sleep(0.5)
                 continue
 
             try:
-                print("[Screen Share] Taking screenshot...")
                 start = time.perf_counter()
 
+                # Skip this frame while the socket still holds a couple of unsent frames, so a slow
+                # link drops frames here instead of queueing seconds of them in the kernel
+                queued = unsent_bytes(self.client)
+                if queued is not None and self._frame_size and queued > MAX_UNSENT_FRAMES * self._frame_size:
+                    time.sleep(1 / FPS)
+                    continue
+
                 with self._lock:
                     width, height = self.img_size
 
@@ -217,33 +326,86 @@ class ScreenShare(threading.Thread):
                     time.sleep(0.5)
                     continue
 
-                # Compress image data
-                compressed_bytes = zlib.compress(image_bytes, level=6)
-                if not compressed_bytes:
-                    print("[Screen Share] Compression failed")
-                    time.sleep(0.5)
-                    continue
+                # Skip frames identical to the last one sent (static screen), refreshing periodically
+                digest = frame_digest(image_bytes)
+                if digest == self._last_digest and self._skipped_frames < MAX_SKIPPED_FRAMES:
+                    self._skipped_frames += 1
+                else:
+                    self._last_digest = digest
+                    self._skipped_frames = 0
+                    _put_latest(self._encrypt_queue, image_bytes)
+
+                # Maintain frame rate, slowing down to the rate the network actually drains frames
+                # so a congested link doesn't make us capture frames that will only be dropped
+                frame_period = max(1 / FPS, self._send_time_avg)
+                elapsed = time.perf_counter() - start
+
+                # After several frames well over the target period, skip the next one to let the link catch up
+                if max(elapsed, self._send_time_avg) > SLOW_FRAME_FACTOR / FPS:
+                    self._slow_frames += 1
+                else:
+                    self._slow_frames = 0
+                if self._slow_frames >= SLOW_FRAMES_BEFORE_SKIP:
+                    self._slow_frames = 0
+                    frame_period += 1 / FPS
+
+                time.sleep(max(0, frame_period - elapsed))
+
+            except Exception as e:
+                print(f"[Screen Share] Error: {e}")
+                time.sleep(1)
 
-                # Encrypt the compressed data
-                iv, encrypted = Encryption.encrypt_aes(self.aes_key, compressed_bytes)
+    def _encrypt_loop(self):
+        """
+        Pipeline stage that compresses (if enabled) and encrypts captured frames.
+        """
+        while not self.stop_event.is_set():
+            try:
+                image_bytes = self._encrypt_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            try:
+                # Compress image data only if enabled; JPEG bytes barely shrink under entropy coding
+                if self._compressor:
+                    payload = self._compressor.compress(image_bytes)
+                    if not payload:
+                        print("[Screen Share] Compression failed")
+                        continue
+                else:
+                    payload = image_bytes
+
+                # Encrypt the frame payload
+                nonce, encrypted = Encryption.encrypt_aes(self.aes_cipher, payload)
                 if not encrypted:
                     print("[Screen Share] Encryption failed")
-                    time.sleep(0.5)
                     continue
 
-                # Send data to server
-                self.client.sendall(len(encrypted).to_bytes(8, 'big'))
-                self.client.sendall(iv)
-                self.client.sendall(encrypted)
+                _put_latest(self._send_queue, (FRAME_LENGTH.pack(len(encrypted)), nonce, encrypted))
 
-                print(f"[Screen Share] Frame sent | raw={len(image_bytes)} | compressed={len(compressed_bytes)} | encrypted={len(encrypted)}")
+            except Exception as e:
+                print(f"[Screen Share] Encryption error: {e}")
 
-                # Maintain frame rate
-                elapsed = time.perf_counter() - start
-                time.sleep(max(0, (1 / FPS) - elapsed))
+    def _send_loop(self):
+        """
+        Pipeline stage that writes encrypted frames to the server socket.
+        """
+        while not self.stop_event.is_set():
+            try:
+                parts = self._send_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            try:
+                # Send length, nonce and ciphertext to the server in a single gather write
+                start = time.perf_counter()
+                send_all_parts(self.client, parts)
+                send_time = time.perf_counter() - start
+                self._send_time_avg += SEND_TIME_SMOOTHING * (send_time - self._send_time_avg)
+                self._frame_size = sum(len(part) for part in parts)
 
             except Exception as e:
-                print(f"[Screen Share] Error: {e}")
+                print(f"[Screen Share] Send error: {e}")
                 time.sleep(1)
 
     def update_size(self, new_size):
@@ -261,4 +423,23 @@ class ScreenShare(threading.Thread):
         """
         Stop the screen sharing thread.
         """
-        self.stop_event.set()
\ No newline at end of file
+        self.stop_event.set()
+
+
+def _put_latest(bounded_queue, item):
+    """
+    Put an item on a bounded queue, discarding the oldest queued item if it is full.
+
+    :param bounded_queue: Queue created with a maxsize.
+    :type bounded_queue: queue.Queue
+    :param item: Item to enqueue.
+    """
+    while True:
+        try:
+            bounded_queue.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                bounded_queue.get_nowait()  # Drop the oldest frame to keep latency bounded
+            except queue.Empty:
+                pass
\ No newline at end of file
@@ -1,169 +1,136 @@
 #Encryption.py
-from cryptography.hazmat.primitives.asymmetric import rsa, padding as asy_pad
-from cryptography.hazmat.primitives import serialization, hashes, padding as sy_pad
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import x25519
+from cryptography.hazmat.primitives import serialization, hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 import os
 
 
-def generate_rsa_keys():
+# Size in bytes of a raw X25519 public key as sent during the key exchange
+PUBLIC_KEY_SIZE = 32
+
+# Context string binding the HKDF output to its use as this app's session key
+SESSION_KEY_INFO = b"screen share session key"
+
+# Size in bytes of the AES-GCM nonce sent in front of every encrypted message
+NONCE_SIZE = 12
+
+# Size in bytes of the GCM authentication tag appended to every ciphertext
+TAG_SIZE = 16
+
+
+def generate_ecdh_keys():
     """
-    Generate an RSA private-public key pair.
+    Generate an X25519 private-public key pair for ECDH key agreement.
 
     :return: Tuple containing (private_key, public_key).
-    :rtype: (rsa.RSAPrivateKey, rsa.RSAPublicKey)
+    :rtype: (x25519.X25519PrivateKey, x25519.X25519PublicKey)
     """
-    # Generate private RSA key with public exponent 65537 and 2048-bit key size
-    private_key = rsa.generate_private_key(
-        public_exponent=65537,
-        key_size=2048,
-    )
+    private_key = x25519.X25519PrivateKey.generate()
     # Derive the corresponding public key from private key
     public_key = private_key.public_key()
     return private_key, public_key
 
 
-def generate_aes_key():
+def derive_aes_key(private_key, peer_public_key):
     """
-    Generate a random 256-bit AES key.
+    Derive a 256-bit AES session key from our private key and the peer's public key.
 
+    :param private_key: Our X25519 private key.
+    :type private_key: x25519.X25519PrivateKey
+    :param peer_public_key: The peer's X25519 public key.
+    :type peer_public_key: x25519.X25519PublicKey
     :return: AES key bytes.
     :rtype: bytes
     """
-    # os.urandom generates cryptographically secure random bytes
-    return os.urandom(32)  # 32 bytes = 256 bits
-
-
-def rsa_encrypt(public_key, text):
-    """
-    Encrypt text using RSA public key with OAEP padding.
-
-    :param public_key: RSA public key for encryption.
-    :type public_key: rsa.RSAPublicKey
-    :param text: Plaintext to encrypt (str or bytes).
-    :type text: str or bytes
-    :return: Encrypted ciphertext bytes.
-    :rtype: bytes
-    """
-    # Convert text to bytes if necessary
-    if type(text) is not bytes:
-        text = text.encode()
-
-    # Encrypt using OAEP padding with SHA-256 as hash function
-    ciphertext = public_key.encrypt(
-        text,
-        asy_pad.OAEP(
-            mgf=asy_pad.MGF1(algorithm=hashes.SHA256()),
-            algorithm=hashes.SHA256(),
-            label=None
-        )
-    )
-    return ciphertext
+    # Both sides compute the same shared secret; HKDF turns it into a uniform AES key
+    shared_secret = private_key.exchange(peer_public_key)
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,  # 32 bytes = 256 bits
+        salt=None,
+        info=SESSION_KEY_INFO,
+    ).derive(shared_secret)
 
 
-def rsa_decrypt(private_key, ciphertext):
+def serialize_public_key(public_key):
     """
-    Decrypt ciphertext using RSA private key with OAEP padding.
+    Serialize X25519 public key to its raw 32-byte form.
 
-    :param private_key: RSA private key for decryption.
-    :type private_key: rsa.RSAPrivateKey
-    :param ciphertext: Encrypted bytes to decrypt.
-    :type ciphertext: bytes
-    :return: Decrypted plaintext bytes.
+    :param public_key: X25519 public key to serialize.
+    :type public_key: x25519.X25519PublicKey
+    :return: Raw public key bytes.
     :rtype: bytes
     """
-    # Decrypt ciphertext using OAEP padding with SHA-256 as hash function
-    decrypted_message = private_key.decrypt(
-        ciphertext,
-        asy_pad.OAEP(
-            mgf=asy_pad.MGF1(algorithm=hashes.SHA256()),
-            algorithm=hashes.SHA256(),
-            label=None
-        )
+    return public_key.public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw
     )
-    return decrypted_message
 
 
-def serialize_public_key(public_key):
+def deserialize_public_key(data):
     """
-    Serialize RSA public key to PEM format bytes.
+    Deserialize raw 32-byte data to X25519 public key.
 
-    :param public_key: RSA public key to serialize.
-    :type public_key: rsa.RSAPublicKey
-    :return: PEM-encoded public key bytes.
-    :rtype: bytes
+    :param data: Raw public key bytes.
+    :type data: bytes
+    :return: X25519 public key object.
+    :rtype: x25519.X25519PublicKey
     """
-    pem = public_key.public_bytes(
-        encoding=serialization.Encoding.PEM,
-        format=serialization.PublicFormat.SubjectPublicKeyInfo
-    )
-    return pem
+    return x25519.X25519PublicKey.from_public_bytes(data)
 
 
-def deserialize_public_key(pem):
+def create_aes_cipher(key):
     """
-    Deserialize PEM bytes to RSA public key.
+    Create a reusable AES-GCM cipher context so the key schedule is computed once per session.
 
-    :param pem: PEM-encoded public key bytes.
-    :type pem: bytes
-    :return: RSA public key object.
-    :rtype: rsa.RSAPublicKey
+    :param key: AES key bytes (256-bit).
+    :type key: bytes
+    :return: AES-GCM cipher context accepted by encrypt_aes and decrypt_aes.
+    :rtype: AESGCM
     """
-    return serialization.load_pem_public_key(pem)
+    return AESGCM(key)
 
 
 def encrypt_aes(key, text):
     """
-    Encrypt text using AES-CBC with PKCS7 padding.
+    Encrypt text using AES-GCM.
 
-    :param key: AES key bytes (256-bit).
-    :type key: bytes
+    :param key: AES key bytes (256-bit) or a cipher context from create_aes_cipher.
+    :type key: bytes or AESGCM
     :param text: Plaintext to encrypt (str or bytes).
     :type text: str or bytes
-    :return: Tuple (iv, ciphertext) where iv is the initialization vector.
+    :return: Tuple (nonce, ciphertext) where ciphertext ends with the 16-byte GCM tag.
     :rtype: (bytes, bytes)
     """
     # Convert text to bytes if necessary
     if type(text) is not bytes:
         text = text.encode()
 
-    # Generate a random 16-byte IV for AES CBC mode
-    iv = os.urandom(16)
-
-    # Pad the plaintext to be multiple of block size (128 bits for AES)
-    padder = sy_pad.PKCS7(128).padder()
-    padded_data = padder.update(text) + padder.finalize()
+    # Generate a random 12-byte nonce for AES GCM mode
+    nonce = os.urandom(NONCE_SIZE)
 
-    # Create AES cipher object in CBC mode
-    cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
-    encryptor = cipher.encryptor()
+    # Reuse the cipher context when one is given instead of rebuilding it per message
+    cipher = key if isinstance(key, AESGCM) else AESGCM(key)
 
-    # Encrypt the padded plaintext
-    ciphertext = encryptor.update(padded_data) + encryptor.finalize()
-    return iv, ciphertext
+    # GCM is a stream mode, so no padding is needed; the tag is appended to the ciphertext
+    ciphertext = cipher.encrypt(nonce, text, None)
+    return nonce, ciphertext
 
 
-def decrypt_aes(key, iv, ciphertext):
+def decrypt_aes(key, nonce, ciphertext):
     """
-    Decrypt AES-CBC encrypted ciphertext with PKCS7 padding removal.
+    Decrypt and authenticate AES-GCM encrypted ciphertext.
 
-    :param key: AES key bytes (256-bit).
-    :type key: bytes
-    :param iv: Initialization vector used during encryption.
-    :type iv: bytes
-    :param ciphertext: Encrypted ciphertext bytes.
+    :param key: AES key bytes (256-bit) or a cipher context from create_aes_cipher.
+    :type key: bytes or AESGCM
+    :param nonce: Nonce used during encryption.
+    :type nonce: bytes
+    :param ciphertext: Encrypted ciphertext bytes including the GCM tag.
     :type ciphertext: bytes
     :return: Decrypted plaintext bytes.
     :rtype: bytes
+    :raises cryptography.exceptions.InvalidTag: If the ciphertext was tampered with.
     """
-    # Create AES cipher object in CBC mode with provided IV
-    cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
-    decryptor = cipher.decryptor()
-
-    # Decrypt ciphertext to padded plaintext
-    padded_plaintext = decryptor.update(ciphertext) + decryptor.finalize()
-
-    # Remove PKCS7 padding from plaintext
-    unpadder = sy_pad.PKCS7(128).unpadder()
-    plaintext = unpadder.update(padded_plaintext) + unpadder.finalize()
-    return plaintext
+    cipher = key if isinstance(key, AESGCM) else AESGCM(key)
+    return cipher.decrypt(nonce, ciphertext, None)
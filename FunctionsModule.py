@@ -1,11 +1,37 @@
 #FunctionsModule.py
-from PIL import ImageGrab
-from io import BytesIO
+import socket
+import struct
+import sys
+import threading
+import cv2
+import mss
+import numpy as np
 from pynput import mouse, keyboard
 
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGRA
+    _turbo_jpeg = TurboJPEG()  # libjpeg-turbo SIMD encoder, used instead of OpenCV when available
+except (ImportError, OSError, RuntimeError):  # package or the libturbojpeg shared library is missing
+    _turbo_jpeg = None
 
-# Maximum chunk size for socket receiving to avoid too large reads at once
-MAX_CHUNK_SIZE = 4096
+try:
+    import fcntl
+    import termios
+    _OUTQ_REQUEST = termios.TIOCOUTQ  # ioctl reading a socket's unsent byte count (SIOCOUTQ on Linux)
+except (ImportError, AttributeError):  # Windows has no ioctl for it
+    _OUTQ_REQUEST = None
+
+
+# recv flag that makes the kernel wait until the whole request has arrived (0 where unsupported)
+RECV_WAITALL = getattr(socket, "MSG_WAITALL", 0)
+
+# Whether screen frames are zstd-compressed before encryption. Frames are JPEG,
+# which is already entropy-coded, so compression only costs CPU; both ends must agree.
+USE_COMPRESSION = False
+
+# Wire length prefixes: 8-byte big-endian for screen frames, 4-byte big-endian for commands
+FRAME_LENGTH = struct.Struct('>Q')
+COMMAND_LENGTH = struct.Struct('>I')
 
 # Mapping string mouse button IDs to pynput mouse.Button enums
 MOUSE_BUTTON_MAP = {
@@ -87,6 +113,13 @@ KEYBOARD_SPECIAL_KEYS_MAP = {
     'parenright': ')',
 }
 
+# Per-thread capture state (mss handle and reusable pixel buffers); mss handles must not be shared between threads
+_capture_state = threading.local()
+
+# Flags set by Windows low-level hooks on events that were injected with SendInput
+LLKHF_INJECTED = 0x10
+LLMHF_INJECTED = 0x01
+
 
 class UserBlocker:
     """
@@ -99,6 +132,9 @@ class UserBlocker:
         """
         self.keyboard_listener = None
         self.mouse_listener = None
+        # Windows hooks can tell injected events apart, so remote input passes through
+        # without restarting the listeners around every injected event
+        self.passes_injected_input = sys.platform == "win32"
 
     def start_blocking(self):
         """
@@ -106,12 +142,39 @@ class UserBlocker:
         This creates and starts listeners that prevent any input from reaching other apps.
         """
         if not self.keyboard_listener or not self.mouse_listener:
-            # Suppress=True means events are blocked/suppressed system-wide
-            self.keyboard_listener = keyboard.Listener(suppress=True)
-            self.mouse_listener = mouse.Listener(suppress=True)
+            if self.passes_injected_input:
+                # Suppress only physical input; events injected by InputController are let through
+                self.keyboard_listener = keyboard.Listener(win32_event_filter=self._keyboard_filter)
+                self.mouse_listener = mouse.Listener(win32_event_filter=self._mouse_filter)
+            else:
+                # Suppress=True means events are blocked/suppressed system-wide
+                self.keyboard_listener = keyboard.Listener(suppress=True)
+                self.mouse_listener = mouse.Listener(suppress=True)
             self.keyboard_listener.start()
             self.mouse_listener.start()
 
+    def _keyboard_filter(self, msg, data):
+        """
+        Windows keyboard hook filter that suppresses every event not injected by software.
+
+        :param msg: Windows message identifier.
+        :param data: KBDLLHOOKSTRUCT describing the event.
+        """
+        listener = self.keyboard_listener
+        if listener and not data.flags & LLKHF_INJECTED:
+            listener.suppress_event()
+
+    def _mouse_filter(self, msg, data):
+        """
+        Windows mouse hook filter that suppresses every event not injected by software.
+
+        :param msg: Windows message identifier.
+        :param data: MSLLHOOKSTRUCT describing the event.
+        """
+        listener = self.mouse_listener
+        if listener and not data.flags & LLMHF_INJECTED:
+            listener.suppress_event()
+
     def stop_blocking(self):
         """
         Stop blocking user input by stopping the keyboard and mouse listeners.
@@ -143,6 +206,13 @@ class InputController:
         self.mouse = mouse.Controller()
         self.keyboard = keyboard.Controller()
 
+        # Command name -> handler taking the rest of the command string
+        self._handlers = {
+            "button": self._click,
+            "key_down": self._press_key,
+            "key_up": self._release_key,
+        }
+
     def set_mouse_pos(self, x_pos, y_pos):
         """
         Set the mouse cursor position on screen.
@@ -158,40 +228,50 @@ class InputController:
 
         :param command: Command string, e.g. "button:1:100:200", "key_down:Shift_L".
         """
+        name, _, args = command.partition(":")
+        self.handle_input(name, args)
+
+    def handle_input(self, name, args):
+        """
+        Execute an already parsed input command.
+
+        :param name: Command name: "button", "key_down" or "key_up".
+        :param args: Rest of the command after the first colon, e.g. "1:100:200" or "Shift_L".
+        """
         try:
+            handler = self._handlers.get(name)
+            if handler is None:
+                return
+
             with self.block_event_lock:
-                was_blocking = self.block_event.is_set()
+                # Only blockers that also swallow injected input need to be lifted around it
+                was_blocking = self.block_event.is_set() and not self.user_blocker.passes_injected_input
                 if was_blocking:
                     # Temporarily stop blocking so injected inputs are accepted by the system
                     self.user_blocker.stop_blocking()
 
-                sliced_command = command.split(":")
-                if sliced_command[0] == "button":
-                    # Mouse button click command: button:<button_num>:<x>:<y>
-                    button_num = sliced_command[1]
-                    x = int(sliced_command[2])
-                    y = int(sliced_command[3])
-                    button = MOUSE_BUTTON_MAP.get(button_num)
-                    if button:
-                        self.set_mouse_pos(x, y)
-                        self.mouse.click(button)
-                    else:
-                        print(f"[InputController] Unknown mouse button: {button_num}")
-
-                elif sliced_command[0] == "key_down":
-                    # Key press command
-                    self._press_key(sliced_command[1])
-
-                elif sliced_command[0] == "key_up":
-                    # Key release command
-                    self._release_key(sliced_command[1])
+                handler(args)
 
                 if was_blocking:
                     # Restart blocking after input injection to continue suppressing real user input
                     self.user_blocker.start_blocking()
 
         except Exception as e:
-            print(f"[InputController] Error handling command '{command}': {e}")
+            print(f"[InputController] Error handling command '{name}:{args}': {e}")
+
+    def _click(self, args):
+        """
+        Move the mouse and click a button.
+
+        :param args: String "<button_num>:<x>:<y>".
+        """
+        button_num, x, y = args.split(":")
+        button = MOUSE_BUTTON_MAP.get(button_num)
+        if button:
+            self.set_mouse_pos(int(x), int(y))
+            self.mouse.click(button)
+        else:
+            print(f"[InputController] Unknown mouse button: {button_num}")
 
     def _press_key(self, key):
         """
@@ -224,6 +304,21 @@ class InputController:
                 print(f"[InputController] Invalid key release: {key}")
 
 
+def _reusable_buffer(name, shape):
+    """
+    Return this thread's cached pixel buffer for the given purpose, reallocating only when its shape changes.
+
+    :param name: Attribute name the buffer is cached under.
+    :param shape: Required array shape.
+    :return: Writable uint8 NumPy array of the given shape.
+    """
+    buffer = getattr(_capture_state, name, None)
+    if buffer is None or buffer.shape != shape:
+        buffer = np.empty(shape, dtype=np.uint8)
+        setattr(_capture_state, name, buffer)
+    return buffer
+
+
 def take_screenshot(x_size=1920, y_size=1080, quality=75):
     """
     Capture a screenshot of the screen resized to given dimensions and compressed as JPEG.
@@ -233,19 +328,72 @@ def take_screenshot(x_size=1920, y_size=1080, quality=75):
     :param quality: JPEG quality (0-100).
     :return: JPEG image bytes.
     """
-    # Capture the entire screen
-    screenshot = ImageGrab.grab()
+    # Reuse this thread's mss handle instead of reopening the display for every frame
+    sct = getattr(_capture_state, "sct", None)
+    if sct is None:
+        sct = _capture_state.sct = mss.mss()
+
+    # Capture the primary monitor as a BGRA buffer and view it as an array without copying
+    raw = sct.grab(sct.monitors[1])
+    screenshot = np.frombuffer(raw.bgra, dtype=np.uint8).reshape(raw.height, raw.width, 4)
+
+    # Resize screenshot to target resolution (INTER_AREA averages pixels when shrinking),
+    # writing into a buffer reused across frames instead of allocating a new one each time
+    resized = _reusable_buffer("resized", (y_size, x_size, 4))
+    screenshot = cv2.resize(screenshot, (x_size, y_size), dst=resized, interpolation=cv2.INTER_AREA)
 
-    # Resize screenshot to target resolution
-    screenshot = screenshot.resize((x_size, y_size))
+    if _turbo_jpeg is not None:
+        # libjpeg-turbo encodes straight from BGRA, skipping the colour conversion pass
+        return _turbo_jpeg.encode(screenshot, quality=quality, pixel_format=TJPF_BGRA)
 
-    # Save screenshot to in-memory byte stream in JPEG format with specified quality
-    byte_io = BytesIO()
-    screenshot.save(byte_io, format='JPEG', quality=quality)
-    byte_io.seek(0)
+    converted = _reusable_buffer("converted", (y_size, x_size, 3))
+    screenshot = cv2.cvtColor(screenshot, cv2.COLOR_BGRA2BGR, dst=converted)
 
-    # Return the raw bytes of the JPEG image
-    return byte_io.getvalue()
+    # Encode to JPEG with the specified quality and return the raw bytes
+    success, encoded = cv2.imencode('.jpg', screenshot, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not success:
+        return b''
+    return encoded.tobytes()
+
+
+def send_all_parts(sock, parts):
+    """
+    Send several byte buffers back to back, using a single gather write where the platform supports it.
+
+    :param sock: Socket object to send on.
+    :param parts: Sequence of bytes-like buffers to send in order.
+    """
+    if not hasattr(sock, "sendmsg"):
+        # No scatter-gather support (e.g. Windows): fall back to one concatenated write
+        sock.sendall(b"".join(parts))
+        return
+
+    views = [memoryview(part) for part in parts if len(part)]
+    while views:
+        sent = sock.sendmsg(views)
+        # Drop fully sent buffers and trim a partially sent one before retrying
+        while sent:
+            if sent >= len(views[0]):
+                sent -= len(views.pop(0))
+            else:
+                views[0] = views[0][sent:]
+                sent = 0
+
+
+def unsent_bytes(sock):
+    """
+    Number of bytes written to a socket that are still waiting in the kernel's send queue.
+
+    :param sock: Connected TCP socket.
+    :return: Queued byte count, or None where the platform can't report it.
+    """
+    if _OUTQ_REQUEST is None:
+        return None
+    try:
+        result = fcntl.ioctl(sock.fileno(), _OUTQ_REQUEST, b"\0" * 4)
+    except OSError:
+        return None  # e.g. macOS only supports it on terminals
+    return int.from_bytes(result, sys.byteorder, signed=True)
 
 
 def recv_all(sock, num_bytes):
@@ -257,12 +405,27 @@ def recv_all(sock, num_bytes):
     :return: Received bytes.
     :raises ConnectionError: If the connection is lost before all bytes are received.
     """
-    data = b''
-    while len(data) < num_bytes:
-        # Receive the remaining number of bytes or MAX_CHUNK_SIZE, whichever is smaller
-        packet = sock.recv(min(MAX_CHUNK_SIZE, num_bytes - len(data)))
-        if not packet:
+    # Receive straight into a pre-sized buffer instead of growing a bytes object per packet
+    data = bytearray(num_bytes)
+    recv_into_all(sock, memoryview(data))
+    return bytes(data)
+
+
+def recv_into_all(sock, view):
+    """
+    Fill a writable buffer completely from a socket, handling partial receives.
+
+    :param sock: Socket object to receive from.
+    :param view: memoryview over the buffer to fill; exactly len(view) bytes are received.
+    :raises ConnectionError: If the connection is lost before the buffer is full.
+    """
+    num_bytes = len(view)
+    received = 0
+    while received < num_bytes:
+        # On a blocking socket MSG_WAITALL fills the rest in one call; short reads (signals,
+        # timeouts, non-blocking sockets) are picked up by the loop
+        count = sock.recv_into(view[received:], num_bytes - received, RECV_WAITALL)
+        if not count:
             # Connection lost unexpectedly
             raise ConnectionError("Connection lost while receiving data")
-        data += packet
-    return data
+        received += count
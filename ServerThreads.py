@@ -1,24 +1,204 @@
 #ServerThreads.py
 import threading
+import collections
 import Encryption
+import selectors
 import socket
-import queue
-import zlib
 import time
-from FunctionsModule import recv_all  # Helper to receive fixed amount of bytes from socket
+
+from FunctionsModule import send_all_parts, USE_COMPRESSION, FRAME_LENGTH, COMMAND_LENGTH  # Socket helper and wire format
+
+if USE_COMPRESSION:
+    try:
+        import zstandard  # Frame codec, only required when USE_COMPRESSION is enabled
+    except ImportError as e:
+        raise ImportError("USE_COMPRESSION is enabled but the zstandard package is not installed") from e
 
 FPS = 10  # Frames per second for limiting frame handling rate
 
+INITIAL_FRAME_BUFFER_SIZE = 2 * 1024 * 1024  # Starting size of each client's reusable frame buffer
+FRAME_HEADER_SIZE = FRAME_LENGTH.size + Encryption.NONCE_SIZE  # Frame size prefix followed by the AES-GCM nonce
+
+SELECT_TIMEOUT = 0.5  # Longest the server loop blocks before checking for stop and expired key exchanges
+KEY_EXCHANGE_TIMEOUT = 5  # Seconds a new client has to send its public key
+SEND_TIMEOUT = 5  # Seconds a command send may block on a client that is not reading
+
+
+def _send_framed(sock, aes_key, payload):
+    """
+    Encrypt a command and send it with its length prefix and nonce in a single gather write.
+
+    :param sock: Client socket to send on.
+    :param aes_key: The client's AES key or cipher context from Encryption.create_aes_cipher.
+    :param payload: Command plaintext bytes.
+    """
+    nonce, encrypted = Encryption.encrypt_aes(aes_key, payload)
+    send_all_parts(sock, (COMMAND_LENGTH.pack(len(encrypted)), nonce, encrypted))
+
+
+class SignalQueue:
+    """
+    Unbounded FIFO for one consumer thread, built on collections.deque whose append and popleft
+    are atomic without a Python-level lock. Producers set an Event after appending; the consumer
+    waits on it once and then drains everything queued.
+
+    Producers use put/put_nowait like on a queue.Queue; the consumer reads only through wait and drain.
+    """
+    def __init__(self):
+        self._items = collections.deque()
+        self._ready = threading.Event()
+
+    def put(self, item):
+        """
+        Appends an item and wakes the consumer.
+
+        :param item: The item to queue.
+        """
+        self._items.append(item)
+        self._ready.set()
+
+    put_nowait = put  # Never full, so both behave the same
+
+    def wait(self, timeout=None):
+        """
+        Blocks until an item has been put since the last wait, or the timeout passes.
+        The signal is cleared before the caller drains, so a put during draining wakes the next wait.
+
+        :param timeout: Maximum time to block in seconds, or None to block indefinitely.
+        """
+        self._ready.wait(timeout)
+        self._ready.clear()
+
+    def wake(self):
+        """
+        Wakes the consumer without queueing anything, so it notices a stop request.
+        """
+        self._ready.set()
+
+    def drain(self):
+        """
+        Yields queued items oldest first until the queue is empty.
+        """
+        while True:
+            try:
+                yield self._items.popleft()
+            except IndexError:
+                return
+
+
+class CommandQueue(SignalQueue):
+    """
+    SignalQueue of (client_address, command) pairs that coalesces resize commands: a queued resize
+    is skipped once a newer resize for the same address has been queued, so a burst of window
+    resizes sends only the final size. The newest resize keeps its own position in the queue,
+    so clients end up with the same size as if every resize had been sent.
+    """
+    def __init__(self):
+        super().__init__()
+        self._latest_resize = {}  # Map client address (None for broadcast) -> number of its newest queued resize
+        self._resize_count = 0
+        self._resize_lock = threading.Lock()
+
+    def put(self, item):
+        """
+        Queues a command and wakes the consumer, superseding any queued resize to the same address.
+
+        :param item: Tuple of (client_address, command).
+        """
+        client_address, cmd = item
+        if cmd.startswith("resize"):
+            with self._resize_lock:
+                self._resize_count += 1
+                self._latest_resize[client_address] = self._resize_count
+                item = (client_address, cmd, self._resize_count)
+        super().put(item)
+
+    put_nowait = put  # Never full, so both behave the same
+
+    def drain(self):
+        """
+        Yields queued (client_address, command) pairs oldest first, skipping superseded resizes.
+        """
+        for item in super().drain():
+            if len(item) == 3:
+                client_address, cmd, number = item
+                with self._resize_lock:
+                    if self._latest_resize.get(client_address) != number:
+                        continue  # A newer resize for this address is further back in the queue
+                    del self._latest_resize[client_address]
+                item = (client_address, cmd)
+            yield item
+
+
+class LatestFrameSlots:
+    """
+    Holds only the newest undelivered frame of each client. A frame that arrives before the consumer
+    took the previous one replaces it, so a consumer that falls behind skips frames instead of
+    working through a backlog of them.
+    """
+    def __init__(self):
+        self._slots = {}  # Map client address -> newest frame
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def put(self, client_address, frame):
+        """
+        Stores a client's newest frame, replacing any it has waiting, and wakes the consumer.
+
+        :param client_address: Address of the client the frame came from.
+        :param frame: The frame to store.
+        """
+        with self._lock:
+            self._slots[client_address] = frame
+        self._ready.set()
+
+    def discard(self, client_address):
+        """
+        Drops a client's waiting frame, if any.
+
+        :param client_address: Address of the client whose frame to drop.
+        """
+        with self._lock:
+            self._slots.pop(client_address, None)
+
+    def wait(self, timeout=None):
+        """
+        Blocks until a frame has been put since the last wait, or the timeout passes.
+
+        :param timeout: Maximum time to block in seconds, or None to block indefinitely.
+        """
+        self._ready.wait(timeout)
+        self._ready.clear()
+
+    def wake(self):
+        """
+        Wakes the consumer without queueing anything, so it notices a stop request.
+        """
+        self._ready.set()
+
+    def drain(self):
+        """
+        Takes the waiting frame of every client.
+
+        :return: (client_address, frame) pairs.
+        """
+        with self._lock:
+            slots, self._slots = self._slots, {}
+        return slots.items()
+
 
 class Server(threading.Thread):
     """
     TCP Server for handling encrypted client connections, receiving image frames, and dispatching commands.
 
+    A single selector loop accepts connections and drives every client's ClientHandler, so the number of
+    threads stays constant no matter how many clients connect.
+
     :param ip: IP address to bind the server.
     :param port: Port number to listen on.
     :param app: Reference to the application object for GUI and state interactions.
     :param command_queue: Queue for sending commands to clients.
-    :param frame_queue: Queue for handling incoming frames from clients.
+    :param frame_queue: LatestFrameSlots holding each client's newest incoming frame.
     :param close_callback: Optional callback to be called when the server stops.
     """
     def __init__(self, ip, port, app, command_queue, frame_queue, close_callback=None):
@@ -30,76 +210,59 @@ class Server(threading.Thread):
 
         self.close_callback = close_callback  # Optional callback when server closes
 
-        # Generate RSA key pair for secure key exchange
-        self.private_key, self.public_key = Encryption.generate_rsa_keys()
-        # Generate AES symmetric key for encrypting communication after exchange
-        self.aes_key = Encryption.generate_aes_key()
-
-        self.rsa_keys = {}  # Store clients' RSA public keys after key exchange
-        self.rsa_keys_lock = threading.Lock()  # Lock for thread-safe access to rsa_keys
-
-        self.client_sockets_and_threads = {}  # Map client address -> (socket, handler thread)
+        self.client_sockets_and_handlers = {}  # Map client address -> (socket, handler) after key exchange
         self.clients_lock = threading.Lock()  # Lock for thread-safe client dict access
 
+        self.selector = selectors.DefaultSelector()  # Readiness notifications for the listening and client sockets
+        self.handlers = {}  # Map client socket -> ClientHandler, including clients still in key exchange
+
         self.command_queue = command_queue  # Queue of commands to send to clients
         self.frame_queue = frame_queue  # Queue of received frames from clients
 
         self.pause_event = threading.Event()  # Used to pause/unpause clients
-        self.condition = threading.Condition()  # Condition variable (not shown used here)
         self.stop_event = threading.Event()  # Signal to stop the server and threads
 
         # Thread that sends commands from the queue to clients
-        self.command_sender = CommandConsumer(self.client_sockets_and_threads, self.clients_lock, self.command_queue,
-                                              self.pause_event, self.app)
+        self.command_sender = CommandConsumer(self.client_sockets_and_handlers, self.clients_lock,
+                                              self.command_queue, self.pause_event, self.app)
         # Thread that consumes frames from clients and updates the app UI
         self.frame_updater = FrameConsumer(self.app, self.frame_queue)
 
     def run(self):
         """
-        Main server loop that listens for incoming connections, handles key exchange, and starts handler threads.
+        Main server loop that waits on all sockets at once, accepting new clients and
+        letting each ClientHandler consume whatever data has arrived for it.
         """
         stop_reason = "session closed"  # Default stop reason
         try:
             # Bind and listen on given IP and port
             self.server.bind((self.ip, self.port))
             self.server.listen(100)  # Allow backlog of 100 connections
+            self.server.setblocking(False)
+            self.selector.register(self.server, selectors.EVENT_READ, self.accept)
             print(f"[Server] TCP Server listening on port: {self.port}")
 
             # Start the command sender and frame updater threads
             self.command_sender.start()
             self.frame_updater.start()
 
-            # Main loop to accept new clients and handle key exchange
+            # Event loop: each registered socket carries the callback that handles its readiness
             while not self.stop_event.is_set():
-                client_socket, client_address = self.key_exchange()
-                if client_socket:
-                    print(f"[Server] Accepted connection from {client_address}")
-
-                    # Notify client of UI button size for resizing input areas
-                    button_width, button_height = self.app.button_size
-                    self.command_queue.put((client_address, f"resize:{button_width}:{button_height}"))
-
-                    # If paused, send pause command to the new client immediately
-                    if self.pause_event.is_set():
-                        try:
-                            iv, encrypted_command = Encryption.encrypt_aes(self.aes_key, b"pause")
-                            client_socket.send(len(encrypted_command).to_bytes(4, 'big'))
-                            client_socket.send(iv)
-                            client_socket.send(encrypted_command)
-                            print("[Server] Pause sent to new client")
-                        except Exception as e:
-                            print(f"[Server] Failed to send pause to new client {client_address}: {e}")
-
-                    # Create and start a client handler thread to receive frames from this client
-                    handler = ClientHandler(client_socket, client_address, self.frame_queue, self.aes_key, self.app)
-                    with self.clients_lock:
-                        self.client_sockets_and_threads[client_address] = (client_socket, handler)
-                    handler.start()
+                for key, _ in self.selector.select(self.select_timeout()):
+                    key.data()
+                self.service_handlers()
 
         except Exception as e:
-            stop_reason = "server crashed"
-            print(f"[Server] Unexpected exception: {e}")
+            # Sockets closed by stop() from another thread can make select() fail during shutdown
+            if not self.stop_event.is_set():
+                stop_reason = "server crashed"
+                print(f"[Server] Unexpected exception: {e}")
         finally:
+            # Close clients that never finished their key exchange; stop() closes the rest
+            for handler in list(self.handlers.values()):
+                if handler.aes_cipher is None:
+                    self.close_handler(handler)
+            self.selector.close()
             self.stop(stop_reason)
 
     def stop(self, stop_reason):
@@ -111,9 +274,9 @@ class Server(threading.Thread):
         # Signal all threads and connections to stop
         self.stop_event.set()
 
-        # Close all client connections and stop their threads
+        # Close all client connections and stop their handlers
         with self.clients_lock:
-            for sock, handler in self.client_sockets_and_threads.values():
+            for sock, handler in self.client_sockets_and_handlers.values():
                 handler.stop()
                 sock.close()
 
@@ -128,141 +291,283 @@ class Server(threading.Thread):
         if self.close_callback:
             self.close_callback(stop_reason)
 
-    def key_exchange(self):
+    def accept(self):
         """
-        Performs RSA key exchange with a new client and sends the AES key.
-
-        :returns: Tuple of (client_socket, client_address) if successful, else (None, None).
+        Accepts a pending connection and registers a ClientHandler to perform its key exchange.
         """
-        # Perform RSA key exchange with a newly connecting client
-        if self.stop_event.is_set():
-            return None, None
-
+        client_socket = None
         try:
             client_socket, client_address = self.server.accept()
 
-            if self.stop_event.is_set():
+            # Disable Nagle so small command messages go out immediately
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Reads only happen once the selector reports data; the timeout bounds command sends from other threads
+            client_socket.settimeout(SEND_TIMEOUT)
+        except BlockingIOError:
+            return  # Another readiness event already took the connection
+        except OSError as e:
+            # A connection aborted before setup or running out of descriptors only affects this client
+            print(f"[Server] Failed to accept connection: {e}")
+            if client_socket is not None:
                 client_socket.close()
-                return None, None
+            return
 
-            # Set short timeout for key exchange phase
-            client_socket.settimeout(5)
+        handler = ClientHandler(client_socket, client_address, self)
+        self.handlers[client_socket] = handler
+        self.selector.register(client_socket, selectors.EVENT_READ, handler.on_readable)
+
+    def add_client(self, handler):
+        """
+        Registers a client whose key exchange completed and sends it its initial commands.
+
+        :param handler: The ClientHandler that derived the client's AES session key.
+        """
+        client_socket, client_address = handler.client_socket, handler.client_address
+        print(f"[Server] Accepted connection from {client_address}")
+
+        # Allow the app to accept input/frames from this address
+        self.app.allow_address(client_address)
+
+        # If paused, send pause command to the new client immediately, before the command sender
+        # can see it, so the two threads never write to its socket at the same time
+        if self.pause_event.is_set():
             try:
-                # Receive length and then client's public key bytes
-                client_key_len = int.from_bytes(recv_all(client_socket, 4), 'big')
-                client_key_bytes = recv_all(client_socket, client_key_len)
-                # Deserialize client RSA public key
-                client_key = Encryption.deserialize_public_key(client_key_bytes)
-            except socket.timeout:
-                client_socket.close()
-                return None, None
+                _send_framed(client_socket, handler.aes_cipher, b"pause")
+                print("[Server] Pause sent to new client")
+            except Exception as e:
+                print(f"[Server] Failed to send pause to new client {client_address}: {e}")
 
-            # Send server's public key to client
-            server_key_bytes = Encryption.serialize_public_key(self.public_key)
-            client_socket.send(len(server_key_bytes).to_bytes(4, 'big'))
-            client_socket.send(server_key_bytes)
+        # Register before queueing the resize so the command sender can already find this client
+        with self.clients_lock:
+            self.client_sockets_and_handlers[client_address] = (client_socket, handler)
 
-            # Encrypt AES key with client's RSA public key and send
-            encrypted_aes_key = Encryption.rsa_encrypt(client_key, self.aes_key)
-            client_socket.send(len(encrypted_aes_key).to_bytes(4, 'big'))
-            client_socket.send(encrypted_aes_key)
+        # Notify client of UI button size for resizing input areas
+        button_width, button_height = self.app.button_size
+        self.command_queue.put((client_address, f"resize:{button_width}:{button_height}"))
 
-            client_socket.settimeout(None)  # Remove timeout for normal operation
+    def drop_client(self, handler):
+        """
+        Closes a client's connection after an error or stop and forgets it.
 
-            # Save the client's public key for future reference
-            with self.rsa_keys_lock:
-                self.rsa_keys[client_address] = client_key
+        :param handler: The ClientHandler of the client to drop.
+        """
+        self.close_handler(handler)
+        with self.clients_lock:
+            self.client_sockets_and_handlers.pop(handler.client_address, None)
 
-            # Allow the app to accept input/frames from this address
-            self.app.allow_address(client_address)
+    def close_handler(self, handler):
+        """
+        Removes a handler from the selector loop and closes its socket.
 
-            return client_socket, client_address
-        except Exception as e:
-            print(f"[Server] Key exchange error: {e}")
-            return None, None
+        :param handler: The ClientHandler to close.
+        """
+        self.handlers.pop(handler.client_socket, None)
+        if handler.resume_time is None:
+            self.selector.unregister(handler.client_socket)
+        try:
+            handler.client_socket.close()
+        except OSError as e:
+            print(f"[Server] Error closing socket for {handler.client_address}: {e}")
+
+    def pause_reading(self, handler, resume_time):
+        """
+        Stops watching a client's socket until resume_time; unread frames stay in the kernel buffer,
+        which pushes back on the client just like a blocked reader would.
+
+        :param handler: The ClientHandler to pause.
+        :param resume_time: time.monotonic() value at which reading resumes.
+        """
+        self.selector.unregister(handler.client_socket)
+        handler.resume_time = resume_time
 
+    def select_timeout(self):
+        """
+        Computes how long select() may block before a paused handler is due to resume.
 
-class ClientHandler(threading.Thread):
+        :return: Timeout in seconds.
+        :rtype: float
+        """
+        timeout = SELECT_TIMEOUT
+        now = time.monotonic()
+        for handler in self.handlers.values():
+            if handler.resume_time is not None:
+                timeout = min(timeout, max(0.0, handler.resume_time - now))
+        return timeout
+
+    def service_handlers(self):
+        """
+        Resumes paused handlers that are due, and closes handlers that were stopped
+        or did not finish their key exchange in time.
+        """
+        now = time.monotonic()
+        for handler in list(self.handlers.values()):
+            if handler.stop_event.is_set():
+                self.drop_client(handler)
+            elif handler.aes_cipher is None and now > handler.key_exchange_deadline:
+                print(f"[Server] Key exchange timed out for {handler.client_address}")
+                self.close_handler(handler)
+            elif handler.resume_time is not None and now >= handler.resume_time:
+                handler.resume_time = None
+                self.selector.register(handler.client_socket, selectors.EVENT_READ, handler.on_readable)
+
+
+class ClientHandler:
     """
-    Handles receiving frames from an individual client over a secure channel.
+    Non-blocking protocol state machine for an individual client, driven by the server's selector loop.
+
+    Performs the key exchange, then reassembles each length-prefixed encrypted frame across as many
+    reads as it takes, and leaves it in the frame slots for the FrameConsumer to decrypt.
 
     :param client_socket: The socket connected to the client.
     :param client_address: Tuple representing the client's IP and port.
-    :param frame_queue: Queue where the received frames are placed.
-    :param aes_key: AES key for decrypting received data.
-    :param app: Reference to the application for state and UI updates.
+    :param server: The Server whose selector loop drives this handler.
     """
-    def __init__(self, client_socket, client_address, frame_queue, aes_key, app):
-        super().__init__()
+    def __init__(self, client_socket, client_address, server):
         self.client_socket = client_socket
         self.client_address = client_address
-        self.frame_queue = frame_queue
-        self.aes_key = aes_key
-        self.app = app
+        self.server = server
+        self.frame_queue = server.frame_queue
+        self.app = server.app
+        self.client_public_key = None
+        self.aes_key = None
+        self.aes_cipher = None  # Key schedule computed once the key exchange completes
+        # Decompression context reused for every frame from this client
+        self._decompressor = zstandard.ZstdDecompressor() if USE_COMPRESSION else None
         self.stop_event = threading.Event()
+        self.key_exchange_deadline = time.monotonic() + KEY_EXCHANGE_TIMEOUT
+        self.resume_time = None  # Set while reading is paused to enforce the FPS limit
         self.min_frame_interval = 1.0 / FPS  # Enforce max FPS
-        self.last_frame_time = 0  # Timestamp of last received frame
 
-    def run(self):
+        # Holds the client's public key during the key exchange and each frame's size and nonce after it
+        self._header = bytearray(max(Encryption.PUBLIC_KEY_SIZE, FRAME_HEADER_SIZE))
+        self._header_view = memoryview(self._header)
+        # Reusable receive buffer for encrypted frames, grown only when a larger frame arrives
+        self._frame_buffer = bytearray(INITIAL_FRAME_BUFFER_SIZE)
+        self._frame_view = memoryview(self._frame_buffer)
+        self._nonce = None
+
+        # Current read: the view being filled, how much of it has arrived, and what to do once it is full
+        self._target = self._header_view[:Encryption.PUBLIC_KEY_SIZE]
+        self._received = 0
+        self._on_complete = self._finish_key_exchange
+
+    def _expect(self, view, on_complete):
+        """
+        Starts filling a new buffer view.
+
+        :param view: Memoryview to fill with the next bytes from the client.
+        :param on_complete: Called once the view is full.
+        """
+        self._target = view
+        self._received = 0
+        self._on_complete = on_complete
+
+    def on_readable(self):
         """
-        Main loop that receives encrypted and compressed image frames from the client,
-        decrypts and decompresses them, and puts them in the frame queue.
+        Consumes the data currently available on the socket, advancing the state machine
+        each time the buffer it is filling becomes full.
         """
         try:
-            while not self.stop_event.is_set():
-                current_time = time.time()
-                elapsed = current_time - self.last_frame_time
+            count = self.client_socket.recv_into(self._target[self._received:])
+            if not count:
+                raise ConnectionError("Connection lost while receiving data")
+            self._received += count
+            if self._received == len(self._target):
+                self._on_complete()
+
+        except Exception as e:
+            print(f"[ClientHandler] {self.client_address} error: {e}")
+            self.server.drop_client(self)
+            if self.aes_cipher is not None:
+                self.request_cleanup()
 
-                # Sleep if frames are arriving too fast (enforce FPS limit)
-                if elapsed < self.min_frame_interval:
-                    time.sleep(self.min_frame_interval - elapsed)
+    def request_cleanup(self):
+        """
+        Requests app cleanup of this client from the GUI thread, unless the app is shutting down.
+        """
+        if not self.app.shutdown_event.is_set():
+            try:
+                self.app.root.after(0, lambda: self.app.cleanup(self.client_address))
+            except RuntimeError as tk_err:
+                print(f"[ClientHandler] GUI already closed for {self.client_address}: {tk_err}")
+
+    def _finish_key_exchange(self):
+        """
+        Derives the AES session key from the client's public key and replies with an ephemeral server key.
+        """
+        # Deserialize client X25519 public key
+        self.client_public_key = Encryption.deserialize_public_key(bytes(self._target))
 
-                # Receive size of incoming frame (8 bytes)
-                image_size = int.from_bytes(recv_all(self.client_socket, 8), byteorder='big')
-                if image_size == 0:
-                    raise ConnectionError("Received empty frame size")
+        # Fresh key pair per client: the private key is dropped once the session key is derived,
+        # so a later compromise of the server cannot decrypt recorded sessions (forward secrecy)
+        private_key, public_key = Encryption.generate_ecdh_keys()
 
-                # Receive AES IV and encrypted image bytes
-                iv = recv_all(self.client_socket, 16)
-                encrypted_img = recv_all(self.client_socket, image_size)
+        # Send server's public key to client
+        self.client_socket.sendall(Encryption.serialize_public_key(public_key))
 
-                # Decrypt and decompress the frame image data
-                frame = Encryption.decrypt_aes(self.aes_key, iv, encrypted_img)
-                frame = zlib.decompress(frame)
+        # Derive the AES key for this client from the ECDH shared secret
+        self.aes_key = Encryption.derive_aes_key(private_key, self.client_public_key)
+        self.aes_cipher = Encryption.create_aes_cipher(self.aes_key)
 
-                timestamp = time.time()
-                # Put the frame into the shared queue with client address and timestamp
-                self.frame_queue.put((self.client_address, frame, timestamp))
-                self.last_frame_time = timestamp
+        self.server.add_client(self)
+        self._expect(self._header_view[:FRAME_HEADER_SIZE], self._finish_header)
 
-        except Exception as e:
-            print(f"[ClientHandler] {self.client_address} error: {e}")
-            if not self.app.shutdown_event.is_set():
-                try:
-                    # Request app cleanup of this client from the GUI thread
-                    self.app.root.after(0, lambda: self.app.cleanup(self.client_address))
-                except RuntimeError as tk_err:
-                    print(f"[ClientHandler] GUI already closed for {self.client_address}: {tk_err}")
-        finally:
-            try:
-                self.client_socket.close()
-            except OSError as e:
-                print(f"[ClientHandler] Error closing socket for {self.client_address}: {e}")
+    def _finish_header(self):
+        """
+        Reads the frame size (8 bytes) and AES-GCM nonce, then starts receiving the encrypted image.
+        """
+        image_size, = FRAME_LENGTH.unpack_from(self._header)
+        if image_size == 0:
+            raise ConnectionError("Received empty frame size")
+        self._nonce = bytes(self._header_view[FRAME_LENGTH.size:FRAME_HEADER_SIZE])
+
+        # The encrypted image length includes the GCM tag
+        if image_size > len(self._frame_buffer):
+            self._frame_buffer = bytearray(image_size)
+            self._frame_view = memoryview(self._frame_buffer)
+        self._expect(self._frame_view[:image_size], self._finish_frame)
+
+    def _finish_frame(self):
+        """
+        Hands the received frame, still encrypted, to the frame slots; it replaces any frame
+        from this client that the FrameConsumer has not taken yet.
+        """
+        timestamp = time.monotonic()
+        # Copy out of the receive buffer, which the next frame overwrites
+        self.frame_queue.put(self.client_address, (self, self._nonce, bytes(self._target), timestamp))
+
+        self._expect(self._header_view[:FRAME_HEADER_SIZE], self._finish_header)
+        # Leave the next frame unread until the FPS interval has passed
+        self.server.pause_reading(self, timestamp + self.min_frame_interval)
+
+    def decode_frame(self, nonce, encrypted_img):
+        """
+        Decrypts (and, if the client compresses frames, decompresses) a frame received by this handler.
+        Only the FrameConsumer thread calls this, so the decompression context is never shared.
+
+        :param nonce: The frame's AES-GCM nonce.
+        :param encrypted_img: The encrypted image bytes, including the GCM tag.
+        :return: The image data.
+        :rtype: bytes
+        """
+        frame = Encryption.decrypt_aes(self.aes_cipher, nonce, encrypted_img)
+        if self._decompressor:
+            frame = self._decompressor.decompress(frame)
+        return frame
 
     def stop(self):
         """
-        Signals the thread to stop receiving frames.
+        Signals the server loop to stop receiving frames from this client and close its socket.
         """
-        # Signal to stop receiving frames and close the thread
         self.stop_event.set()
 
 
 class FrameConsumer(threading.Thread):
     """
-    Consumes image frames from the queue and updates the UI accordingly.
+    Consumes the newest frame of each client, decrypts it and updates the UI accordingly.
 
     :param app: Reference to the application for UI updates.
-    :param frame_queue: Queue containing incoming frames from clients.
+    :param frame_queue: LatestFrameSlots containing incoming frames from clients.
     """
     def __init__(self, app, frame_queue):
         super().__init__()
@@ -274,34 +579,42 @@ class FrameConsumer(threading.Thread):
     def run(self):
         """
         Main loop that consumes frames and triggers screen updates if frames are fresh.
+        Stale or unwanted frames are dropped before any decryption work is spent on them.
         """
         while not self.stop_event.is_set():
-            try:
-                # Wait for a new frame from any client, timeout after 1 second
-                client_address, frame, timestamp = self.frame_queue.get(timeout=1)
+            # Sleep until a client delivers a frame or stop() wakes the queue
+            self.frame_queue.wait()
+            for client_address, (handler, nonce, encrypted_img, timestamp) in self.frame_queue.drain():
                 # Only update screen if frame is fresh enough
-                if time.time() - timestamp <= self.max_frame_age:
-                    # Update screen only if no fullscreen widget or fullscreen client matches frame client
-                    if not self.app.fullscreen_widget or self.app.fullscreen_address == client_address:
-                        self.app.update_screen(client_address, frame)
-                else:
+                if time.monotonic() - timestamp > self.max_frame_age:
                     print(f"[FrameConsumer] Dropped stale frame from {client_address}")
-            except queue.Empty:
-                continue  # No frame available, continue loop
+                    continue
+
+                # Update screen only if no fullscreen widget or fullscreen client matches frame client
+                if not self.app.fullscreen_widget or self.app.fullscreen_address == client_address:
+                    try:
+                        frame = handler.decode_frame(nonce, encrypted_img)
+                    except Exception as e:
+                        print(f"[FrameConsumer] Invalid frame from {client_address}: {e}")
+                        handler.stop()
+                        handler.request_cleanup()
+                        continue
+                    self.app.update_screen(client_address, frame)
 
     def stop(self):
         """
         Signals the frame consumer to stop processing frames.
         """
-        # Signal to stop processing frames
+        # Signal to stop processing frames and wake the consumer if it is waiting
         self.stop_event.set()
+        self.frame_queue.wake()
 
 
 class CommandConsumer(threading.Thread):
     """
     Sends encrypted commands to one or more clients based on the queue input.
 
-    :param clients_dict: Dictionary mapping client addresses to (socket, handler thread).
+    :param clients_dict: Dictionary mapping client addresses to (socket, handler).
     :param clients_lock: Lock for thread-safe access to the client dictionary.
     :param command_queue: Queue containing commands to be sent.
     :param pause_event: Event signaling whether the system is paused.
@@ -323,10 +636,11 @@ class CommandConsumer(threading.Thread):
         Supports pause, unpause, resize, and other custom commands.
         """
         while not self.stop_event.is_set():
-            try:
-                # Wait for next command, timeout after 1 second
-                client_address, cmd = self.command_queue.get(timeout=1)
-                print(f"[CommandConsumer] Command: {cmd}")
+            # Sleep until a command is queued or stop() wakes the queue
+            self.command_queue.wait()
+            for client_address, cmd in self.command_queue.drain():
+                # Encoded once; the ciphertext itself must differ per client (own key, fresh nonce)
+                payload = cmd.encode()
 
                 if cmd in ("pause", "unpause"):
                     # Handle global pause/unpause commands
@@ -335,74 +649,72 @@ class CommandConsumer(threading.Thread):
                     else:
                         self.pause_event.clear()
 
+                    # Send pause/unpause command to all clients except sender
                     with self.clients_lock:
-                        # Send pause/unpause command to all clients except sender
-                        for addr, (sock, thread) in list(self.clients_dict.items()):
-                            if addr != client_address:
-                                try:
-                                    iv, encrypted_cmd = Encryption.encrypt_aes(thread.aes_key, cmd.encode())
-                                    sock.send(len(encrypted_cmd).to_bytes(4, 'big'))
-                                    sock.send(iv)
-                                    sock.send(encrypted_cmd)
-                                except Exception as e:
-                                    print(f"[CommandConsumer] Failed to send command to {addr}: {e}")
-                                    thread.stop()
-                                    del self.clients_dict[addr]
-                                    self.app.root.after(0, lambda: self.app.cleanup(addr))
+                        targets = [(addr, sock, handler) for addr, (sock, handler) in self.clients_dict.items()
+                                   if addr != client_address]
+                    for addr, sock, handler in targets:
+                        try:
+                            _send_framed(sock, handler.aes_cipher, payload)
+                        except Exception as e:
+                            print(f"[CommandConsumer] Failed to send command to {addr}: {e}")
+                            self.remove_client(addr, handler)
+                            self.app.root.after(0, self.app.cleanup, addr)
                     continue
 
                 elif cmd.startswith("resize"):
                     # Handle resize commands either for a specific client or all
                     with self.clients_lock:
-                        targets = []
                         if client_address is None:
                             # Broadcast to all clients
-                            targets = list(self.clients_dict.items())
+                            targets = [(addr, sock, handler) for addr, (sock, handler) in self.clients_dict.items()]
                         elif client_address in self.clients_dict:
                             # Send only to specified client
-                            targets = [(client_address, self.clients_dict[client_address])]
-
-                        for addr, (sock, thread) in targets:
-                            try:
-                                iv, encrypted_cmd = Encryption.encrypt_aes(thread.aes_key, cmd.encode())
-                                sock.send(len(encrypted_cmd).to_bytes(4, 'big'))
-                                sock.send(iv)
-                                sock.send(encrypted_cmd)
-                            except Exception as e:
-                                print(f"[CommandConsumer] Failed to send resize to {addr}: {e}")
-                                thread.stop()
-                                del self.clients_dict[addr]
-                                self.app.root.after(0, lambda: self.app.cleanup(addr))
+                            targets = [(client_address, *self.clients_dict[client_address])]
+                        else:
+                            targets = []
+                    for addr, sock, handler in targets:
+                        try:
+                            _send_framed(sock, handler.aes_cipher, payload)
+                        except Exception as e:
+                            print(f"[CommandConsumer] Failed to send resize to {addr}: {e}")
+                            self.remove_client(addr, handler)
+                            self.app.root.after(0, self.app.cleanup, addr)
                     continue
 
                 else:
                     # Handle other commands directed at specific client
                     with self.clients_lock:
-                        if client_address in self.clients_dict:
-                            sock, thread = self.clients_dict[client_address]
-                            aes_key = thread.aes_key
-                            try:
-                                iv, encrypted_cmd = Encryption.encrypt_aes(aes_key, cmd.encode())
-                                sock.send(len(encrypted_cmd).to_bytes(4, 'big'))
-                                sock.send(iv)
-                                sock.send(encrypted_cmd)
-
-                                # If the command is "kick", stop the client handler and remove client
-                                if cmd == "kick":
-                                    thread.stop()
-                                    del self.clients_dict[client_address]
-
-                            except Exception as e:
-                                print(f"[CommandConsumer] Unexpected error with {client_address}: {e}")
-                                thread.stop()
-                                del self.clients_dict[client_address]
-                                self.app.root.after(0, lambda: self.app.kick(client_address))
-            except queue.Empty:
-                continue  # No command available, continue loop
+                        target = self.clients_dict.get(client_address)
+                    if target:
+                        sock, handler = target
+                        try:
+                            _send_framed(sock, handler.aes_cipher, payload)
+
+                            # If the command is "kick", stop the client handler and remove client
+                            if cmd == "kick":
+                                self.remove_client(client_address, handler)
+
+                        except Exception as e:
+                            print(f"[CommandConsumer] Unexpected error with {client_address}: {e}")
+                            self.remove_client(client_address, handler)
+                            self.app.root.after(0, self.app.kick, client_address)
+
+    def remove_client(self, client_address, handler):
+        """
+        Stops a client's handler and removes it from the client dictionary.
+
+        :param client_address: Address of the client to remove.
+        :param handler: The client's ClientHandler.
+        """
+        handler.stop()
+        with self.clients_lock:
+            self.clients_dict.pop(client_address, None)
 
     def stop(self):
         """
         Signals the command consumer to stop processing commands.
         """
-        # Signal to stop processing commands
-        self.stop_event.set()
\ No newline at end of file
+        # Signal to stop processing commands and wake the consumer if it is waiting
+        self.stop_event.set()
+        self.command_queue.wake()
\ No newline at end of file
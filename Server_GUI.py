@@ -2,13 +2,19 @@
 import tkinter as tk
 from PIL import ImageTk, Image
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 import math
 import os
-import queue
 import threading
 import time
 import socket
 
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _turbo_jpeg = TurboJPEG()  # libjpeg-turbo SIMD decoder, used instead of Pillow when available
+except (ImportError, OSError, RuntimeError):  # package or the libturbojpeg shared library is missing
+    _turbo_jpeg = None
+
 
 # Directory where this script is located, used for loading assets reliably
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -16,8 +22,17 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 # Names of buttons shown in fullscreen mode
 FULLSCREEN_BUTTON_NAMES = ["control start", "block", "kick"]
 
-# Aspect ratio for screen previews (width / height)
-RATIO = 16 / 9
+# Every button in the fullscreen toolbar, left to right
+ALL_FULLSCREEN = tuple(FULLSCREEN_BUTTON_NAMES) + ("exit",)
+
+# Aspect ratio for screen previews, as integer width and height terms
+RATIO_WIDTH, RATIO_HEIGHT = 16, 9
+
+# Scales libjpeg can decode at directly, smallest output first
+JPEG_SCALING_FACTORS = ((1, 8), (1, 4), (1, 2))
+
+# Number of screens whose preview grid is precomputed; larger counts are computed on demand
+GRID_TABLE_SIZE = 64
 
 # Size of control buttons in fullscreen mode (width and height)
 BUTTON_SIZE = 54
@@ -25,6 +40,15 @@ BUTTON_SIZE = 54
 # Height reserved for taskbar or UI elements at bottom
 TASKBAR_HEIGHT = 72
 
+# Interval at which the main thread applies newly decoded frames, one 60 Hz display tick (ms)
+FRAME_PUMP_INTERVAL_MS = 16
+
+# Most client images applied per pump tick; the rest wait for the next tick
+MAX_UPDATES_PER_TICK = 16
+
+# Minimum time between two key_down commands for the same key (30 ms), in nanoseconds
+KEY_DEBOUNCE_NS = 30_000_000
+
 # Tooltip texts associated with each button name
 TOOLTIPS = {
     "control start": "Take control of the screen",
@@ -47,6 +71,24 @@ ICON_FILES = {
 }
 
 
+def grid_for(total_buttons):
+    """
+    Compute the preview grid for a number of screens, using integer math only.
+
+    :param total_buttons: Number of screens to lay out (at least 1).
+    :return: Buttons per row, number of rows and buttons in the last row.
+    :rtype: tuple
+    """
+    num_buttons_per_row = math.isqrt(total_buttons - 1) + 1  # ceil(sqrt(n))
+    number_of_rows = -(-total_buttons // num_buttons_per_row)  # ceil(n / per_row)
+    num_buttons_in_last_row = total_buttons % num_buttons_per_row or num_buttons_per_row
+    return num_buttons_per_row, number_of_rows, num_buttons_in_last_row
+
+
+# Preview grid for every screen count up to GRID_TABLE_SIZE; index 0 is unused
+GRID = ((0, 0, 0),) + tuple(grid_for(n) for n in range(1, GRID_TABLE_SIZE + 1))
+
+
 class ToolTip:
     """Tooltip class to show helper text when hovering over a widget."""
 
@@ -138,6 +180,9 @@ class InfoButtonToolTip(ToolTip):
 class ServerGui:
     """Main GUI class for teacher control app."""
 
+    # Local IP address shown in the info tooltip, looked up by the first instance
+    _cached_local_ip = None
+
     def __init__(self, port, root, command_queue, frame_queue):
         """
         Initialize the ServerGui instance.
@@ -147,35 +192,19 @@ class ServerGui:
         :param root: Tkinter root window.
         :type root: tkinter.Tk
         :param command_queue: Queue for sending commands to clients.
-        :type command_queue: queue.Queue
-        :param frame_queue: Queue for receiving frames/screenshots from clients.
-        :type frame_queue: queue.Queue
+        :type command_queue: ServerThreads.CommandQueue
+        :param frame_queue: Newest-frame-per-client slots for receiving frames/screenshots from clients.
+        :type frame_queue: ServerThreads.LatestFrameSlots
         """
-
-        def get_local_ip():
-            """
-            Get local IP address for display; fallback to error message if unavailable.
-
-            :return: Local IP address or error message.
-            :rtype: str
-            """
-            try:
-                s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                s.connect(("8.8.8.8", 80))  # Use Google's DNS server for IP discovery
-                ip = s.getsockname()[0]
-                s.close()
-                return ip
-            except Exception as e:
-                return f"Error: {e}"
-
-        self.ip = get_local_ip()
+        self.ip = self.get_local_ip()
         self.port = port
         self.root = root
         self.command_queue = command_queue
         self.frame_queue = frame_queue
 
-        # Maintain a set of kicked client addresses for blocking
-        self.kicked_addresses = set()
+        # Kicked client addresses for blocking; writers replace the frozenset under the lock,
+        # so readers on other threads always see a complete set without locking
+        self.kicked_addresses = frozenset()
         self.kicked_lock = threading.Lock()
 
         # Graceful shutdown management
@@ -191,37 +220,86 @@ class ServerGui:
         self.screen_width = self.root.winfo_screenwidth()
         self.screen_height = self.root.winfo_screenheight() - TASKBAR_HEIGHT
         self.fullscreen_size = (
-            math.floor(RATIO * (self.screen_height - BUTTON_SIZE)),
+            RATIO_WIDTH * (self.screen_height - BUTTON_SIZE) // RATIO_HEIGHT,
             self.screen_height - BUTTON_SIZE - 5
         )
         self.button_size = self.fullscreen_size
 
+        # Factors scaling fullscreen click coordinates to the client's 1920x1080 resolution
+        self._sx = 1920 / self.fullscreen_size[0]
+        self._sy = 1080 / self.fullscreen_size[1]
+
         # Track GUI elements and states
         self.buttons = {}
-        self.images = []
+        self._layout_key = None  # Clients and space the preview buttons are currently placed for
+        self._icon_cache = self.load_button_icons()
         self.fullscreen_buttons = self.fullscreen_buttons_create()
         self.fullscreen_widget = None
         self.fullscreen_address = ''
         self.control_switch = False
         self.block_states = {}
 
-        # Key handling and debouncing
-        self.last_key_press_time = {}
+        # Frames are decoded and resized on worker threads so the frame consumer never waits on Pillow
+        self.decode_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="decode")
+        # Newest undecoded frame per client; at most one decode per client runs at a time, so a burst
+        # costs one decode and frames of a client can't finish out of order
+        self.latest_frames = {}
+        self._decoding = set()  # Addresses with a decode task running
+        # Last size requested from each client, so mismatched frames still in flight don't repeat the request;
+        # written by decode workers and the main thread, always under _frames_lock
+        self._last_resize_sent = {}
+        # Bumped when a client is cleaned up; frames stamped with an older generation are discarded
+        self._generations = {}
+        self._frames_lock = threading.Lock()
+
+        # Decoded images, newest per client; the frame pump applies them all on the main thread
+        self._pending_updates = {}
+        self._pending_lock = threading.Lock()
+
+        # Key handling and debouncing (Tk main thread only)
+        self.last_key_press_ns = {}
         self.pressed_keys = set()
-        self.pressed_keys_lock = threading.Lock()
 
         # Bind keyboard events
         self.root.bind("<KeyPress>", self.on_key_press)
         self.root.bind("<KeyRelease>", self.on_key_release)
 
-        # Display when no clients are connected
-        self.no_clients_label = None
+        # Display when no clients are connected; created once and only shown or hidden afterwards
+        self.no_clients_label = tk.Label(
+            self.root,
+            text="No Clients Connected",
+            font=("Arial", 24),
+            fg="white",
+            bg="#232333"
+        )
         self.show_no_clients_message()
 
         # IP and port info label
         self.info_label = None
         self.add_info_button()
 
+        # Start drawing decoded frames once the main loop runs
+        self.root.after(FRAME_PUMP_INTERVAL_MS, self._pump_frames)
+
+    def get_local_ip(self):
+        """
+        Get local IP address for display; fallback to error message if unavailable.
+        The address is looked up once per run and cached on the class.
+
+        :return: Local IP address or error message.
+        :rtype: str
+        """
+        if ServerGui._cached_local_ip is not None:
+            return ServerGui._cached_local_ip
+
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+                s.connect(("8.8.8.8", 80))  # Use Google's DNS server for IP discovery
+                ServerGui._cached_local_ip = s.getsockname()[0]
+        except Exception as e:
+            return f"Error: {e}"  # Not cached, so a later lookup can still succeed
+        return ServerGui._cached_local_ip
+
     def add_info_button(self):
         """
         Add an information icon to the bottom-right corner of the GUI,
@@ -262,15 +340,11 @@ class ServerGui:
         print(f"[GUI] Organizing {total_buttons} screens")
 
         if total_buttons == 0:
+            self._layout_key = None
             self.show_no_clients_message()
             return
 
-        if self.no_clients_label:
-            self.no_clients_label.destroy()
-            self.no_clients_label = None
-
-        for button in self.buttons.values():
-            button.place_forget()
+        self.no_clients_label.place_forget()
 
         # Determine available space
         usable_width = self.screen_width
@@ -289,17 +363,24 @@ class ServerGui:
             if info_x + info_width + margin > self.screen_width - BUTTON_SIZE:
                 usable_width = info_x - margin
 
-        # Layout computation
-        num_buttons_per_row = math.ceil(math.sqrt(total_buttons))
-        number_of_rows = math.ceil(total_buttons / num_buttons_per_row)
-        num_buttons_in_last_row = total_buttons % num_buttons_per_row or num_buttons_per_row
+        # Same clients in the same order and space: every button is already where it belongs
+        layout_key = (tuple(self.buttons), usable_width, usable_height)
+        if layout_key == self._layout_key:
+            return
+        self._layout_key = layout_key
+
+        # Layout computation; place() moves already placed buttons, so they need no place_forget first
+        if total_buttons < len(GRID):
+            num_buttons_per_row, number_of_rows, num_buttons_in_last_row = GRID[total_buttons]
+        else:
+            num_buttons_per_row, number_of_rows, num_buttons_in_last_row = grid_for(total_buttons)
 
         if num_buttons_per_row == number_of_rows:
-            button_height = math.floor(usable_height / number_of_rows)
-            button_width = math.floor(RATIO * button_height)
+            button_height = usable_height // number_of_rows
+            button_width = RATIO_WIDTH * button_height // RATIO_HEIGHT
         else:
-            button_width = math.floor(usable_width / num_buttons_per_row)
-            button_height = math.floor(1 / RATIO * button_width)
+            button_width = usable_width // num_buttons_per_row
+            button_height = RATIO_HEIGHT * button_width // RATIO_WIDTH
 
         current_row = 0
         current_column = 0
@@ -328,15 +409,7 @@ class ServerGui:
         """
         Display a message in the center of the screen indicating that no clients are connected.
         """
-        if not self.no_clients_label:
-            self.no_clients_label = tk.Label(
-                self.root,
-                text="No Clients Connected",
-                font=("Arial", 24),
-                fg="white",
-                bg="#232333"
-            )
-            self.no_clients_label.place(relx=0.5, rely=0.5, anchor="center")
+        self.no_clients_label.place(relx=0.5, rely=0.5, anchor="center")
 
     def _add_screen_on_main_thread(self, address, preview_photo):
         """
@@ -350,10 +423,8 @@ class ServerGui:
         print(f"[GUI] Added a new screen")
         button = tk.Button(self.root, image=preview_photo, background="#232333",
                            command=lambda: self.toggle_fullscreen(address, b""))
-        button.image = preview_photo
-        button.image_id = id(preview_photo)  # Track image to avoid redundant updates
+        button.image = preview_photo  # Keep a reference to avoid garbage collection; later frames paste into it
         self.buttons[address] = button
-        self.images.append(preview_photo)  # Keep a reference to avoid garbage collection
 
         info = self.get_info_text()
         self.info_label.tooltip.update_text(info)  # Update tooltip info
@@ -361,11 +432,15 @@ class ServerGui:
         # Organize screens and notify clients of new resize if no fullscreen is active
         if not self.fullscreen_widget:
             self.organize_screens()
-            self.command_queue.put((None, f"resize:{self.button_size[0]}:{self.button_size[1]}"))
+            self.command_queue.put_nowait((None, f"resize:{self.button_size[0]}:{self.button_size[1]}"))
+            with self._frames_lock:
+                # Every client was just asked for the new size, so frames still in flight at the
+                # old size must not ask again
+                self._last_resize_sent = dict.fromkeys(self.buttons, self.button_size)
 
     def update_screen(self, address, image_bytes):
         """
-        Receive updated screen image bytes from a client and schedule GUI update.
+        Receive updated screen image bytes from a client and queue them for decoding.
 
         :param address: Client's network address.
         :type address: str
@@ -379,45 +454,152 @@ class ServerGui:
             print(f"[GUI] Ignoring frame update from kicked / disconnected client {address}")
             return
 
-        print(f"[GUI] Updating image for {address}")
+        with self._frames_lock:
+            # Replaces a frame that was not decoded yet
+            self.latest_frames[address] = (self._generations.get(address, 0), image_bytes)
+            if address in self._decoding:
+                return  # The running decode task picks this frame up next
+            self._decoding.add(address)
+
         try:
-            image = Image.open(BytesIO(image_bytes))
+            self.decode_pool.submit(self._decode_frames, address)
+        except RuntimeError as e:
+            print(f"[GUI] Decoder already shut down, dropping frame from {address}: {e}")
 
-            preview_photo = None
-            fullscreen_photo = None
+    def _decode_frames(self, address):
+        """
+        Decode a client's newest frame on a decode worker, repeating while newer frames arrived meanwhile.
 
-            if self.fullscreen_address == address:
-                # Resize fullscreen image if needed
-                if image.size != self.fullscreen_size:
-                    fullscreen_image = image.resize(self.fullscreen_size)
-                    self.command_queue.put((address, f"resize:{self.fullscreen_size[0]}:{self.fullscreen_size[1]}"))
-                else:
-                    fullscreen_image = image
-                fullscreen_photo = ImageTk.PhotoImage(fullscreen_image)
+        :param address: Client's network address.
+        :type address: str
+        """
+        while True:
+            with self._frames_lock:
+                frame = self.latest_frames.pop(address, None)
+                if frame is None:
+                    self._decoding.discard(address)
+                    return
+            generation, image_bytes = frame
+            if generation == self._generations.get(address, 0):
+                self._decode_frame(address, generation, image_bytes)
+
+    def _decode_frame(self, address, generation, image_bytes):
+        """
+        Decode and resize a client's frame on a decode worker, then hand the image to the main thread.
+
+        :param address: Client's network address.
+        :type address: str
+        :param generation: The client's generation when the frame arrived.
+        :type generation: int
+        :param image_bytes: Raw image data bytes of the client's screen.
+        :type image_bytes: bytes
+        """
+        try:
+            preview_image = None
+            fullscreen_image = None
+
+            is_fullscreen = self.fullscreen_address == address
+            target_size = self.fullscreen_size if is_fullscreen else self.button_size
+
+            image, frame_size = self.decode_jpeg(image_bytes, target_size)
+
+            # Ask the client to send the needed size from now on
+            if frame_size != target_size:
+                with self._frames_lock:
+                    # A layout change since target_size was read makes it stale; that change requests its own size
+                    current_size = self.fullscreen_size if self.fullscreen_address == address else self.button_size
+                    request_resize = (target_size == current_size
+                                      and self._last_resize_sent.get(address) != target_size)
+                    if request_resize:
+                        self._last_resize_sent[address] = target_size
+                if request_resize:
+                    self.command_queue.put_nowait((address, f"resize:{target_size[0]}:{target_size[1]}"))
+
+            # Resize image if needed
+            if image.size != target_size:
+                image = image.resize(target_size, Image.BILINEAR)
+
+            if is_fullscreen:
+                fullscreen_image = image
             else:
-                # Resize preview image if needed
-                if image.size != self.button_size:
-                    preview_image = image.resize(self.button_size)
-                    self.command_queue.put((address, f"resize:{self.button_size[0]}:{self.button_size[1]}"))
-                else:
-                    preview_image = image
-                preview_photo = ImageTk.PhotoImage(preview_image)
+                preview_image = image
 
-            # Schedule GUI update on the main thread
-            self.root.after(0, lambda: self._update_screen_on_main_thread(address, preview_photo, fullscreen_photo))
+            # Leave the images for the main thread's pump, replacing any this client has not displayed yet
+            with self._pending_lock:
+                self._pending_updates[address] = (generation, preview_image, fullscreen_image)
         except Exception as e:
             print(f"[GUI] Error processing image from {address}: {e}")
 
-    def _update_screen_on_main_thread(self, address, preview_photo, fullscreen_photo):
+    def decode_jpeg(self, image_bytes, target_size):
+        """
+        Decode a JPEG frame at the smallest libjpeg scale (1/8, 1/4 or 1/2) that still covers the target size.
+
+        :param image_bytes: Raw JPEG data of the client's screen.
+        :type image_bytes: bytes
+        :param target_size: Size the image will be displayed at (width, height).
+        :type target_size: tuple
+        :return: The decoded image and the frame's full size (width, height).
+        :rtype: tuple
+        """
+        if _turbo_jpeg is None:
+            image = Image.open(BytesIO(image_bytes))
+            frame_size = image.size
+            if frame_size != target_size:
+                image.draft("RGB", target_size)
+            image.load()  # Decode here rather than on the main thread
+            return image, frame_size
+
+        width, height, _, _ = _turbo_jpeg.decode_header(image_bytes)
+        scaling_factor = None  # Full size
+        if (width, height) != target_size:
+            for num, denom in JPEG_SCALING_FACTORS:
+                # Scaled dimensions are rounded up, as libjpeg-turbo does
+                if ((width * num + denom - 1) // denom >= target_size[0]
+                        and (height * num + denom - 1) // denom >= target_size[1]):
+                    scaling_factor = (num, denom)
+                    break
+
+        # Decoded straight to RGB at the reduced scale; Pillow copies the (already scaled) pixels once
+        pixels = _turbo_jpeg.decode(image_bytes, pixel_format=TJPF_RGB, scaling_factor=scaling_factor)
+        image = Image.frombuffer("RGB", (pixels.shape[1], pixels.shape[0]), pixels, "raw", "RGB", 0, 1)
+        return image, (width, height)
+
+    def _pump_frames(self):
+        """
+        Apply the newest pending images of every client, then schedule the next tick.
+
+        Runs on the main thread from root.after, so decode workers never call into Tk themselves
+        and the main loop sets the pace at which frames are drawn.
+        """
+        if self.shutdown_event.is_set():
+            return  # Stop pumping once the GUI is closing
+
+        try:
+            with self._pending_lock:
+                if len(self._pending_updates) <= MAX_UPDATES_PER_TICK:
+                    updates, self._pending_updates = self._pending_updates, {}
+                else:
+                    # Take the oldest entries first so every client gets its turn
+                    addresses = list(self._pending_updates)[:MAX_UPDATES_PER_TICK]
+                    updates = {address: self._pending_updates.pop(address) for address in addresses}
+
+            for address, (generation, preview_image, fullscreen_image) in updates.items():
+                if generation != self._generations.get(address, 0):
+                    continue  # Decoded before the client was cleaned up
+                self._update_screen_on_main_thread(address, preview_image, fullscreen_image)
+        finally:
+            self.root.after(FRAME_PUMP_INTERVAL_MS, self._pump_frames)
+
+    def _update_screen_on_main_thread(self, address, preview_image, fullscreen_image):
         """
         Update the GUI components for a client's screen on the main thread.
 
         :param address: Client's network address.
         :type address: str
-        :param preview_photo: Tkinter PhotoImage for the preview button, or None.
-        :type preview_photo: ImageTk.PhotoImage or None
-        :param fullscreen_photo: Tkinter PhotoImage for fullscreen display, or None.
-        :type fullscreen_photo: ImageTk.PhotoImage or None
+        :param preview_image: Decoded image for the preview button, or None.
+        :type preview_image: PIL.Image.Image or None
+        :param fullscreen_image: Decoded image for fullscreen display, or None.
+        :type fullscreen_image: PIL.Image.Image or None
         """
         if self.shutdown_event.is_set():
             return  # Prevent updates after shutdown
@@ -426,26 +608,36 @@ class ServerGui:
             print(f"[GUI] Skipping update for kicked / disconnected client {address}")
             return
 
-        if fullscreen_photo is not None:
+        if fullscreen_image is not None:
             # Update fullscreen widget if active and address matches
             if self.fullscreen_widget is not None and self.fullscreen_address == address:
-                if getattr(self.fullscreen_widget, "image_id", None) != id(fullscreen_photo):
-                    self.fullscreen_widget.config(image=fullscreen_photo)
-                    self.fullscreen_widget.image = fullscreen_photo
-                    self.fullscreen_widget.image_id = id(fullscreen_photo)
+                self.show_image(self.fullscreen_widget, fullscreen_image)
             return  # No button update needed in fullscreen mode
 
-        if preview_photo is not None:
+        if preview_image is not None:
             if address in self.buttons:
-                button = self.buttons[address]
-
-                if getattr(button, "image_id", None) != id(preview_photo):
-                    button.config(image=preview_photo)
-                    button.image = preview_photo
-                    button.image_id = id(preview_photo)
+                self.show_image(self.buttons[address], preview_image)
             else:
                 # Add new preview button if not found
-                self._add_screen_on_main_thread(address, preview_photo)
+                self._add_screen_on_main_thread(address, ImageTk.PhotoImage(preview_image))
+
+    def show_image(self, widget, image):
+        """
+        Show a decoded frame on a widget, pasting it into the widget's existing PhotoImage
+        so the Tk image is reused; a new one is only created when the size changed.
+
+        :param widget: Button showing a client's screen.
+        :type widget: tk.Button
+        :param image: Decoded image to show.
+        :type image: PIL.Image.Image
+        """
+        photo = widget.image
+        if (photo.width(), photo.height()) == image.size:
+            photo.paste(image)
+        else:
+            photo = ImageTk.PhotoImage(image)
+            widget.config(image=photo)
+            widget.image = photo
 
     def toggle_fullscreen(self, address, image_bytes):
         """
@@ -459,11 +651,12 @@ class ServerGui:
         self.fullscreen_address = address
 
         # Pause all other clients to focus on fullscreen client
-        self.command_queue.put((self.fullscreen_address, "pause"))
+        self.command_queue.put_nowait((self.fullscreen_address, "pause"))
 
         # Hide all preview buttons while in fullscreen
         for btn in self.buttons.values():
             btn.place_forget()
+        self._layout_key = None  # Previews have to be placed again on exit
 
         # Attempt to use cached preview image, else load from bytes
         button = self.buttons.get(address)
@@ -480,7 +673,6 @@ class ServerGui:
         # Create and display fullscreen widget centered on screen
         self.fullscreen_widget = tk.Button(self.root, image=photo, background="#232333")
         self.fullscreen_widget.image = photo
-        self.fullscreen_widget.image_id = id(photo)
         self.fullscreen_widget.bind("<Button>", self.handle_mouse_click)
         self.fullscreen_widget.place(
             x=(self.screen_width - self.fullscreen_size[0]) // 2,
@@ -497,6 +689,20 @@ class ServerGui:
         self.control_switch = False
         self.update_control_button("control start")
 
+    def load_button_icons(self):
+        """
+        Load and resize every fullscreen button icon once, so toggling a button only swaps images.
+
+        :return: Dictionary mapping button state names to their icons.
+        :rtype: dict[str, ImageTk.PhotoImage]
+        """
+        icons = {}
+        for name, path in ICON_FILES.items():
+            if name == "info":
+                continue  # Shown at its own size by add_info_button
+            icons[name] = ImageTk.PhotoImage(Image.open(path).resize((BUTTON_SIZE, BUTTON_SIZE)))
+        return icons
+
     def fullscreen_buttons_create(self):
         """
         Create fullscreen control buttons (pause, block, exit, etc.) centered below the fullscreen image.
@@ -507,19 +713,16 @@ class ServerGui:
         :rtype: dict[str, tk.Button]
         """
         buttons = {}
-        total_buttons = len(FULLSCREEN_BUTTON_NAMES) + 1  # Extra one for "exit" button
-        offset = (self.screen_width - total_buttons * BUTTON_SIZE) // 2  # Center buttons horizontally
+        offset = (self.screen_width - len(ALL_FULLSCREEN) * BUTTON_SIZE) // 2  # Center buttons horizontally
+        y = self.fullscreen_size[1] + 6  # Place just below fullscreen image
 
-        for i, name in enumerate(FULLSCREEN_BUTTON_NAMES + ["exit"]):
+        for i, name in enumerate(ALL_FULLSCREEN):
             x = offset + i * BUTTON_SIZE
-            y = self.fullscreen_size[1] + 6  # Place just below fullscreen image
 
             # Map button name to method or exit_fullscreen
             command = self.exit_fullscreen if name == "exit" else getattr(self, name.replace(" ", "_"))
 
-            # Load and resize icon image for button
-            icon_image = Image.open(ICON_FILES[name]).resize((BUTTON_SIZE, BUTTON_SIZE))
-            icon = ImageTk.PhotoImage(icon_image)
+            icon = self._icon_cache[name]
 
             # Create button, initially disabled and hidden
             button = tk.Button(self.root, image=icon, background="#232333", state=tk.DISABLED, command=command)
@@ -555,7 +758,7 @@ class ServerGui:
             self.fullscreen_widget = None
 
         # Notify client to unpause
-        self.command_queue.put((self.fullscreen_address, "unpause"))
+        self.command_queue.put_nowait((self.fullscreen_address, "unpause"))
 
         self.fullscreen_address = None  # Clear fullscreen state
 
@@ -570,13 +773,11 @@ class ServerGui:
         :param event: Tkinter mouse event.
         """
         if self.fullscreen_widget and self.fullscreen_address and self.control_switch:
-            x, y = event.x, event.y
             # Scale click coordinates from fullscreen size to client's 1920x1080 resolution
-            scaled_x = int(x * 1920 / self.fullscreen_size[0])
-            scaled_y = int(y * 1080 / self.fullscreen_size[1])
-            scaled_x = min(scaled_x, 1920)
-            scaled_y = min(scaled_y, 1080)
-            self.command_queue.put((self.fullscreen_address, f"button:{event.num}:{scaled_x}:{scaled_y}"))
+            # Clicks on the button's border land past the image; keep them on the client's last pixel
+            scaled_x = min(int(event.x * self._sx), 1919)
+            scaled_y = min(int(event.y * self._sy), 1079)
+            self.command_queue.put_nowait((self.fullscreen_address, f"button:{event.num}:{scaled_x}:{scaled_y}"))
 
     def on_key_press(self, event):
         """
@@ -588,20 +789,16 @@ class ServerGui:
         """
         if self.fullscreen_widget and self.fullscreen_address and self.control_switch:
             key = event.keysym
-            now = time.time()
+            now = time.monotonic_ns()
 
-            with self.pressed_keys_lock:
-                last_time = self.last_key_press_time.get(key, 0)
-                if now - last_time < 0.03:  # 30 ms debounce
-                    return
-                self.last_key_press_time[key] = now
+            # Key events only fire on the Tk main thread, so this state needs no lock
+            if now - self.last_key_press_ns.get(key, 0) < KEY_DEBOUNCE_NS:
+                return
+            self.last_key_press_ns[key] = now
 
-                if key not in self.pressed_keys:
-                    try:
-                        self.command_queue.put_nowait((self.fullscreen_address, f"key_down:{key}"))
-                        self.pressed_keys.add(key)
-                    except queue.Full:
-                        print(f"[KeyPress] Queue full, couldn't send key_down:{key}")
+            if key not in self.pressed_keys:
+                self.command_queue.put_nowait((self.fullscreen_address, f"key_down:{key}"))
+                self.pressed_keys.add(key)
 
     def on_key_release(self, event):
         """
@@ -613,14 +810,10 @@ class ServerGui:
         """
         if self.fullscreen_widget and self.fullscreen_address and self.control_switch:
             key = event.keysym
-            with self.pressed_keys_lock:
-                if key in self.pressed_keys:
-                    try:
-                        self.command_queue.put_nowait((self.fullscreen_address, f"key_up:{key}"))
-                    except queue.Full:
-                        print(f"[KeyRelease] Queue full, couldn't send key_up:{key}")
-                    self.pressed_keys.discard(key)
-                    self.last_key_press_time.pop(key, None)
+            if key in self.pressed_keys:
+                self.command_queue.put_nowait((self.fullscreen_address, f"key_up:{key}"))
+                self.pressed_keys.discard(key)
+                self.last_key_press_ns.pop(key, None)
 
     def control_start(self):
         """Enable control mode for the fullscreen client."""
@@ -641,7 +834,7 @@ class ServerGui:
         :param name: Button state name (e.g., "control start" or "control stop").
         """
         btn = self.fullscreen_buttons["control start"]
-        new_icon = ImageTk.PhotoImage(Image.open(ICON_FILES[name]).resize((BUTTON_SIZE, BUTTON_SIZE)))
+        new_icon = self._icon_cache[name]
         btn.config(image=new_icon, command=getattr(self, name.replace(" ", "_")))
         btn.image = new_icon
         btn.tooltip.update_text(TOOLTIPS[name])
@@ -653,7 +846,7 @@ class ServerGui:
         Updates button and internal block state.
         """
         if self.fullscreen_address and "127.0.0.1" not in self.fullscreen_address:
-            self.command_queue.put((self.fullscreen_address, "block"))
+            self.command_queue.put_nowait((self.fullscreen_address, "block"))
             self.block_states[self.fullscreen_address] = True
             self.update_block_button("unblock")
 
@@ -664,7 +857,7 @@ class ServerGui:
         Updates button and internal block state.
         """
         if self.fullscreen_address:
-            self.command_queue.put((self.fullscreen_address, "unblock"))
+            self.command_queue.put_nowait((self.fullscreen_address, "unblock"))
             self.block_states[self.fullscreen_address] = False
             self.update_block_button("block")
 
@@ -675,7 +868,7 @@ class ServerGui:
         :param name: Button state name ("block" or "unblock").
         """
         btn = self.fullscreen_buttons["block"]
-        new_icon = ImageTk.PhotoImage(Image.open(ICON_FILES[name]).resize((BUTTON_SIZE, BUTTON_SIZE)))
+        new_icon = self._icon_cache[name]
         btn.config(image=new_icon, command=getattr(self, name))
         btn.image = new_icon
         btn.tooltip.update_text(TOOLTIPS[name])
@@ -691,10 +884,10 @@ class ServerGui:
             print("[kick] No address to kick.")
             return
 
-        self.command_queue.put((target, "kick"))
+        self.command_queue.put_nowait((target, "kick"))
 
         with self.kicked_lock:
-            self.kicked_addresses.add(target)
+            self.kicked_addresses = self.kicked_addresses | {target}
 
         self.cleanup(target)
 
@@ -716,7 +909,13 @@ class ServerGui:
         info = self.get_info_text()
         self.info_label.tooltip.update_text(info)
 
-        self.remove_frames_for_address(target)
+        # Frames of this client still being decoded or waiting for the main thread carry the old
+        # generation and are dropped; the server drops the one it is holding
+        with self._frames_lock:
+            self._generations[target] = self._generations.get(target, 0) + 1
+            self.latest_frames.pop(target, None)
+            self._last_resize_sent.pop(target, None)
+        self.frame_queue.discard(target)
 
         if self.fullscreen_address == target:
             self.exit_fullscreen()
@@ -726,36 +925,14 @@ class ServerGui:
     def on_close(self):
         """Handle application close event by signaling shutdown and destroying the GUI."""
         self.shutdown_event.set()  # Notify other threads
+        self.decode_pool.shutdown(wait=False)  # Let queued decodes finish without blocking the GUI
         self.root.after(0, self.root.destroy)  # Safely exit Tkinter main loop
 
     def allow_address(self, address):
         """Allow a previously kicked client address to reconnect."""
         with self.kicked_lock:
             if address in self.kicked_addresses:
-                self.kicked_addresses.remove(address)
-
-    def remove_frames_for_address(self, address):
-        """
-        Remove all queued frames associated with a specific client address.
-
-        Prevents processing frames from kicked clients.
-
-        :param address: Client address whose frames to remove.
-        """
-        temp_list = []
-
-        # Drain queue, keep only frames not from the given address
-        while not self.frame_queue.empty():
-            try:
-                item = self.frame_queue.get_nowait()
-                if item[0] != address:
-                    temp_list.append(item)
-            except queue.Empty:
-                break
-
-        # Put valid frames back in the queue
-        for item in temp_list:
-            self.frame_queue.put(item)
+                self.kicked_addresses = self.kicked_addresses - {address}
 
     def run(self):
         """Start the Tkinter GUI event loop."""